@@ -0,0 +1,81 @@
+# agent 캐시 유무에 따른 /chat 첫 이벤트(status, tool_call)까지의 시간 비교
+# 가짜 채팅 모델/도구를 쓰므로 외부 API 호출 없이 agent 그래프 생성 비용만 잰다.
+# 실행: python -m bench.agent_cache_bench
+import asyncio
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPEN_AI_API_KEY", "sk-fake")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from service.chat_service import ChatService
+
+N_REQUESTS = 50
+
+
+class FakeToolCallingModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@tool
+async def fake_search(query: str):
+    """가짜 검색 도구입니다."""
+    return "검색 결과"
+
+
+class FakeRepo:
+    async def insert_chat(self, content, final_answer, user, db):
+        return [
+            SimpleNamespace(chat_id=0, user_code=user.user_code, role="human", content=content, create_at=None),
+            SimpleNamespace(chat_id=1, user_code=user.user_code, role="ai", content=final_answer, create_at=None),
+        ]
+
+
+async def measure(svc: ChatService, use_cache: bool):
+    first_status, first_tool_call = [], []
+    user = SimpleNamespace(user_code=1)
+    for _ in range(N_REQUESTS):
+        if not use_cache:
+            svc._agents.clear()
+        start = time.perf_counter()
+        status_at = tool_call_at = None
+        async for line in svc.response_llm("요즘 잠이 안 와요", [], user, None):
+            event = json.loads(line)
+            now = time.perf_counter() - start
+            if event["type"] == "status" and status_at is None:
+                status_at = now
+            elif event["type"] == "tool_call" and tool_call_at is None:
+                tool_call_at = now
+        first_status.append(status_at * 1000)
+        first_tool_call.append(tool_call_at * 1000)
+    return first_status, first_tool_call
+
+
+def p50(values):
+    return statistics.median(values)
+
+
+async def main():
+    svc = ChatService()
+    svc.repo = FakeRepo()
+    svc.llm = FakeToolCallingModel(responses=[
+        AIMessage(content="", tool_calls=[{"name": "fake_search", "args": {"query": "잠"}, "id": "call_1"}]),
+        AIMessage(content="푹 쉬는 것이 좋아요."),
+    ])
+    svc.chat_model_tools = [fake_search]
+    for use_cache in (False, True):
+        status, tool_call = await measure(svc, use_cache)
+        label = "cached " if use_cache else "per-req"
+        print(f"{label}  first status p50 {p50(status):7.2f}ms   first tool_call p50 {p50(tool_call):7.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
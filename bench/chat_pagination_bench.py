@@ -0,0 +1,86 @@
+# GET /chat 페이지네이션: OFFSET vs 커서(keyset) 깊이별 지연시간 비교
+# 벤치용 유저와 chat 행을 넣고(page 500 이상 깊이), 측정 후 지운다.
+# 실행: python -m bench.chat_pagination_bench
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import delete, insert, select
+
+from db.mariadb_orm import AsyncSessionLocal, check_db_revision
+from entity.entity import Chat, User
+from repo.chat_repo import ChatRepo
+
+PAGE_SIZE = 20
+PAGES = [1, 500]
+N_ROWS = PAGE_SIZE * (max(PAGES) + 10)
+N_REPEAT = 20
+OAUTH_ID = "bench-chat-pagination"
+
+
+async def seed(db) -> int:
+    now = datetime.now()
+    user = User(oauth_id=OAUTH_ID, nickname="bench", name="bench", create_at=now, enable=True, role="ROLE_USER")
+    db.add(user)
+    await db.commit()
+    start = now - timedelta(seconds=N_ROWS)
+    rows = [
+        {"user_code": user.user_code, "content": f"메시지 {i}", "role": "human" if i % 2 == 0 else "ai", "create_at": start + timedelta(seconds=i // 2)}
+        for i in range(N_ROWS)
+    ]
+    for i in range(0, len(rows), 1000):
+        await db.execute(insert(Chat), rows[i:i + 1000])
+    await db.commit()
+    return user.user_code
+
+
+async def cleanup(db):
+    user_code = (await db.execute(select(User.user_code).where(User.oauth_id == OAUTH_ID))).scalar()
+    if user_code is not None:
+        await db.execute(delete(Chat).where(Chat.user_code == user_code))
+        await db.execute(delete(User).where(User.user_code == user_code))
+        await db.commit()
+
+
+async def timed(fn) -> float:
+    samples = []
+    for _ in range(N_REPEAT):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main():
+    # 테이블은 alembic upgrade head 로 미리 만들어 둔다.
+    await check_db_revision()
+    repo = ChatRepo()
+    async with AsyncSessionLocal() as db:
+        await cleanup(db)
+        user = SimpleNamespace(user_code=await seed(db))
+        try:
+            for page in PAGES:
+                offset = (page - 1) * PAGE_SIZE
+                before = None
+                if offset:
+                    # 이 페이지 바로 앞 행의 (create_at, chat_id) 가 클라이언트가 들고 있을 커서다.
+                    r = await db.execute(
+                        select(Chat.create_at, Chat.chat_id).where(Chat.user_code == user.user_code)
+                        .order_by(Chat.create_at.desc(), Chat.chat_id.desc()).offset(offset - 1).limit(1)
+                    )
+                    before = tuple(r.one())
+                offset_ms = await timed(lambda: repo.get_chats_by_page(db, user, page - 1, PAGE_SIZE))
+                cursor_ms = await timed(lambda: repo.get_chats_by_cursor(db, user, before, PAGE_SIZE))
+                print(f"page {page:>4}  offset p50 {offset_ms:7.2f}ms   cursor p50 {cursor_ms:7.2f}ms")
+        finally:
+            await cleanup(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
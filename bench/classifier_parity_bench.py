@@ -0,0 +1,85 @@
+# 감정 분류기 추론 백엔드별 정확도 일치율 / 처리량 / 메모리 비교 (CPU)
+# fp32(torch) 예측 라벨을 기준으로 각 백엔드의 라벨 일치율을 확인한다.
+# onnx 계열은 처음 실행할 때 MODEL_CACHE_DIR 로 그래프를 내보내고 캐시한다.
+# 실행: python -m bench.classifier_parity_bench
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+MODELS = [
+    "Seonghaa/korean-emotion-classifier-roberta",
+    "LimYeri/HowRU-KoELECTRA-Emotion-Classifier",
+]
+BACKENDS = ["torch", "int8", "onnx", "onnx_int8"]
+TEST_SET = [
+    "오늘 회사에서 발표를 망쳐서 너무 속상해.",
+    "친구랑 오랜만에 만나서 맛있는 거 먹고 왔어!",
+    "내일 시험인데 아무것도 못 해서 불안해 죽겠어.",
+    "그냥 평범한 하루였어. 별일 없었어.",
+    "갑자기 팀장님이 나한테 소리를 질러서 당황했어.",
+    "왜 나만 이렇게 일이 많은지 모르겠어, 진짜 화나.",
+    "강아지가 아파서 병원에 다녀왔는데 마음이 너무 아파.",
+    "드디어 합격 발표가 났어! 너무 기뻐서 눈물이 났어.",
+    "밤에 잠이 안 와서 계속 뒤척였어.",
+    "엄마랑 싸워서 집에 들어가기 싫어.",
+    "오랜만에 산책하면서 바람 쐬니까 마음이 편안해졌어.",
+    "지하철에서 지갑을 잃어버린 걸 알고 너무 놀랐어.",
+    "다음 주 여행이 너무 기대돼서 설레.",
+    "동료가 내 아이디어를 자기 것처럼 발표해서 너무 억울해.",
+    "아무도 내 마음을 몰라주는 것 같아서 외로워.",
+    "운동을 꾸준히 했더니 몸이 가벼워졌어.",
+    "면접 결과가 아직 안 나와서 계속 초조해.",
+    "길에서 모르는 사람이 갑자기 말을 걸어서 깜짝 놀랐어.",
+    "오늘은 아무 생각 없이 푹 쉬었어.",
+    "친구가 약속을 또 어겨서 정말 짜증나.",
+    "할머니가 돌아가신 지 1년이 됐는데 아직도 그리워.",
+    "프로젝트가 성공적으로 끝나서 팀원들이랑 축하했어.",
+    "발표 중에 머리가 하얘져서 아무 말도 못 했어.",
+    "비 오는 날 카페에서 책 읽으니까 차분해지더라.",
+]
+N_REPEAT = 8
+BATCH_SIZE = 32
+
+
+def run_backend(model_path: str, backend: str):
+    from model.classifier import SequenceClassifier
+
+    start = time.perf_counter()
+    clf = SequenceClassifier(model_path, backend=backend)
+    load_time = time.perf_counter() - start
+    probs = clf.predict_proba(TEST_SET, BATCH_SIZE)
+
+    texts = TEST_SET * N_REPEAT
+    clf.predict_proba(texts[:BATCH_SIZE], BATCH_SIZE)
+    start = time.perf_counter()
+    clf.predict_proba(texts, BATCH_SIZE)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss 는 리눅스에서 KB 단위
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return probs, load_time, len(texts) / elapsed, rss_mb
+
+
+def main():
+    models = sys.argv[1:] or MODELS
+    # 백엔드마다 새 프로세스에서 돌려 메모리 사용량이 섞이지 않게 한다.
+    ctx = multiprocessing.get_context("spawn")
+    for model_path in models:
+        print(f"\n{model_path}")
+        print(f"{'backend':<10} {'load(s)':>8} {'utt/s':>8} {'speedup':>8} {'peakRSS(MB)':>12} {'label agree':>12} {'max|dp|':>8}")
+        baseline = None
+        for backend in BACKENDS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                probs, load_time, throughput, rss_mb = pool.submit(run_backend, model_path, backend).result()
+            if baseline is None:
+                baseline = (probs, throughput)
+            base_probs, base_throughput = baseline
+            agree = (probs.argmax(axis=1) == base_probs.argmax(axis=1)).mean() * 100
+            max_diff = abs(probs - base_probs).max()
+            print(f"{backend:<10} {load_time:8.2f} {throughput:8.1f} {throughput / base_throughput:7.2f}x {rss_mb:12.0f} {agree:11.1f}% {max_diff:8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# 쿼리 임베딩 캐시/요청 합치기 효과 측정 (가짜 임베딩 백엔드, 네트워크 없음)
+# 실행: python -m bench.embedding_cache_bench
+import asyncio
+import random
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from service.embedding_service import EmbeddingService
+
+QUESTIONS = [
+    "우울할 때 어떻게 해?",
+    "우울할 때  어떻게 해? ",
+    "잠이 안 올 때는 어떻게 해야 해?",
+    "불안해서 숨이 막혀요",
+    "요즘 아무것도 하기 싫어",
+    "공황장애 증상이 뭐야?",
+]
+N_REQUESTS = 500
+CONCURRENCY = 50
+UPSTREAM_LATENCY = 0.15
+
+
+class SlowFakeEmbedding(DeterministicFakeEmbedding):
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(UPSTREAM_LATENCY)
+        return self.embed_query(text)
+
+
+async def run(svc: EmbeddingService):
+    sem = asyncio.Semaphore(CONCURRENCY)
+    rng = random.Random(0)
+
+    async def one():
+        async with sem:
+            await svc.embed_query(rng.choice(QUESTIONS))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(N_REQUESTS)))
+    return time.perf_counter() - start
+
+
+async def main():
+    for coalesce in (False, True):
+        svc = EmbeddingService(backend=SlowFakeEmbedding(size=1536), coalesce=coalesce)
+        elapsed = await run(svc)
+        stats = svc.stats()
+        print(f"coalesce={coalesce!s:<5} {elapsed:6.2f}s  upstream={stats['upstream_calls']:>4}  hit_ratio={stats['hit_ratio']:.3f}  coalesced={stats['coalesced']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
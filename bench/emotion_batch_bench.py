@@ -0,0 +1,41 @@
+# 감정 분류 배치 크기별 처리량 측정 (CPU)
+# 실행: python -m bench.emotion_batch_bench
+import asyncio
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from service.emotion_service import EmotionService
+
+SAMPLES = [
+    "오늘 회사에서 발표를 망쳐서 너무 속상해.",
+    "친구랑 오랜만에 만나서 맛있는 거 먹고 왔어!",
+    "내일 시험인데 아무것도 못 해서 불안해 죽겠어.",
+    "그냥 평범한 하루였어. 별일 없었어.",
+    "갑자기 팀장님이 나한테 소리를 질러서 당황했어.",
+    "왜 나만 이렇게 일이 많은지 모르겠어, 진짜 화나.",
+    "강아지가 아파서 병원에 다녀왔는데 마음이 너무 아파.",
+    "드디어 합격 발표가 났어! 너무 기뻐서 눈물이 났어.",
+]
+BATCH_SIZES = [1, 8, 32, 64]
+N_UTTERANCES = 256
+
+
+async def main():
+    svc = EmotionService()
+    texts = [SAMPLES[i % len(SAMPLES)] for i in range(N_UTTERANCES)]
+    # 워밍업
+    await svc.classify(texts[:8])
+    print(f"utterances: {N_UTTERANCES}")
+    for batch_size in BATCH_SIZES:
+        svc.batch_size = batch_size
+        start = time.perf_counter()
+        await svc.classify(texts)
+        elapsed = time.perf_counter() - start
+        print(f"batch_size={batch_size:>3}  {elapsed:7.2f}s  {N_UTTERANCES / elapsed:8.1f} utt/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
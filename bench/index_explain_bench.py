@@ -0,0 +1,93 @@
+# chat / analysis_result 주요 조회가 복합 인덱스를 타는지 EXPLAIN 으로 확인하고 지연시간을 잰다.
+# 벤치용 유저들과 데이터를 넣고, 측정 후 지운다. (alembic upgrade head 를 먼저 실행)
+# 실행: python -m bench.index_explain_bench
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import delete, insert, select, text
+
+from db.mariadb_orm import AsyncSessionLocal
+from entity.entity import AnalysisResult, Chat, User
+
+N_USERS = 20
+CHATS_PER_USER = 2000
+DAYS = 365
+OAUTH_PREFIX = "bench-index-"
+
+# (이름, SQL, 기대하는 인덱스)
+QUERIES = [
+    ("get_chats", "SELECT * FROM chat WHERE user_code = :u ORDER BY create_at DESC, chat_id DESC LIMIT 10", "ix_chat_user_create_id"),
+    ("get_today_chat", "SELECT * FROM chat WHERE user_code = :u AND role = 'human' AND create_at >= :start AND create_at < :end", "ix_chat_user_create_id"),
+    ("get_calendar_data", "SELECT * FROM analysis_result WHERE user_code = :u AND create_at >= :m_start AND create_at < :m_end", "ix_analysis_result_user_create"),
+    ("insert_today_emotion(select)", "SELECT * FROM analysis_result WHERE user_code = :u AND create_at >= :start", "ix_analysis_result_user_create"),
+    ("get_latest_by_user_and_date", "SELECT * FROM analysis_result WHERE user_code = :u AND create_at >= :start AND create_at < :end ORDER BY create_at DESC LIMIT 1", "ix_analysis_result_user_create"),
+]
+
+
+async def seed(db) -> list[int]:
+    now = datetime.now()
+    users = [User(oauth_id=f"{OAUTH_PREFIX}{i}", nickname="bench", name="bench", create_at=now, enable=True, role="ROLE_USER") for i in range(N_USERS)]
+    db.add_all(users)
+    await db.commit()
+    for user in users:
+        chats = [
+            {"user_code": user.user_code, "content": f"메시지 {i}", "role": "human" if i % 2 == 0 else "ai", "create_at": now - timedelta(minutes=i * 7)}
+            for i in range(CHATS_PER_USER)
+        ]
+        await db.execute(insert(Chat), chats)
+        results = [
+            {"user_code": user.user_code, "emotion_name": "평온", "create_at": now - timedelta(days=d)}
+            for d in range(DAYS)
+        ]
+        await db.execute(insert(AnalysisResult), results)
+    await db.commit()
+    await db.execute(text("ANALYZE TABLE chat, analysis_result"))
+    return [user.user_code for user in users]
+
+
+async def cleanup(db):
+    user_codes = (await db.execute(select(User.user_code).where(User.oauth_id.like(f"{OAUTH_PREFIX}%")))).scalars().all()
+    if user_codes:
+        await db.execute(delete(Chat).where(Chat.user_code.in_(user_codes)))
+        await db.execute(delete(AnalysisResult).where(AnalysisResult.user_code.in_(user_codes)))
+        await db.execute(delete(User).where(User.user_code.in_(user_codes)))
+        await db.commit()
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        await cleanup(db)
+        user_codes = await seed(db)
+        try:
+            today = datetime.combine(datetime.now().date(), datetime.min.time())
+            params = {
+                "u": user_codes[len(user_codes) // 2],
+                "start": today,
+                "end": today + timedelta(days=1),
+                "m_start": today.replace(day=1),
+                "m_end": (today.replace(day=1) + timedelta(days=32)).replace(day=1),
+            }
+            ok = True
+            for name, sql, expected in QUERIES:
+                plan = (await db.execute(text(f"EXPLAIN {sql}"), params)).mappings().first()
+                samples = []
+                for _ in range(20):
+                    start = time.perf_counter()
+                    await db.execute(text(sql), params)
+                    samples.append((time.perf_counter() - start) * 1000)
+                used = plan["key"] == expected
+                ok = ok and used
+                print(f"{'OK ' if used else 'BAD'} {name:<30} key={plan['key']!s:<32} rows={plan['rows']!s:>6}  p50 {statistics.median(samples):6.2f}ms")
+            print("모든 조회가 복합 인덱스를 사용합니다." if ok else "인덱스를 쓰지 않는 조회가 있습니다.")
+        finally:
+            await cleanup(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
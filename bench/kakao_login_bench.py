@@ -0,0 +1,95 @@
+# /login 의 카카오 호출(토큰 발급 + 유저 정보) 동시 처리량 비교
+# 로컬 스텁 OAuth 서버(고정 지연)를 띄워서 외부 호출 없이 잰다.
+#   blocking : 예전처럼 이벤트 루프에서 requests 를 바로 호출
+#   sync     : KAKAO_HTTP_SYNC=1 경로 (requests 를 스레드에서 호출)
+#   async    : 커넥션 풀을 쓰는 httpx 비동기 클라이언트
+# 실행: python -m bench.kakao_login_bench
+import asyncio
+import os
+import threading
+import time
+
+PORT = 18765
+STUB_URL = f"http://127.0.0.1:{PORT}"
+os.environ.setdefault("KAKAO_AUTH_URL", STUB_URL)
+os.environ.setdefault("KAKAO_API_URL", STUB_URL)
+for key, value in {
+    "JWT_SECRET": "bench", "JWT_ALGORITHM": "HS256", "JWT_EXPIRE_MINUTE": "30", "JWT_REFRESH_EXPIRE_MINUTE": "600",
+    "KAKAO_CLIENT_ID": "bench", "KAKAO_REDIRECT_URI": "http://localhost/login",
+}.items():
+    os.environ.setdefault(key, value)
+
+import uvicorn
+from fastapi import FastAPI
+
+from service.login_service import LoginService
+
+STUB_LATENCY = 0.02
+N_LOGINS = 200
+CONCURRENCY = 50
+
+stub = FastAPI()
+
+
+@stub.post("/oauth/token")
+async def token():
+    await asyncio.sleep(STUB_LATENCY)
+    return {"token_type": "bearer", "access_token": "access", "expires_in": 21599,
+            "refresh_token": "refresh", "refresh_token_expires_in": 5183999}
+
+
+@stub.get("/v2/user/me")
+async def me():
+    await asyncio.sleep(STUB_LATENCY)
+    return {"id": 1, "connected_at": "2026-01-01T00:00:00Z", "properties": {"nickname": "bench"}, "kakao_account": {}}
+
+
+def run_stub() -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def login_blocking(svc: LoginService):
+    token = svc.get_kakao_token("code")
+    svc.get_kakao_user(token.access_token)
+
+
+async def login_sync(svc: LoginService):
+    svc.kakao_sync = True
+    token = await svc.fetch_kakao_token("code")
+    await svc.fetch_kakao_user(token.access_token)
+
+
+async def login_async(svc: LoginService):
+    svc.kakao_sync = False
+    token = await svc.fetch_kakao_token("code")
+    await svc.fetch_kakao_user(token.access_token)
+
+
+async def measure(svc: LoginService, login) -> float:
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with sem:
+            await login(svc)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(N_LOGINS)))
+    return N_LOGINS / (time.perf_counter() - start)
+
+
+async def main():
+    svc = LoginService()
+    for name, login in (("blocking", login_blocking), ("sync", login_sync), ("async", login_async)):
+        await login(svc)
+        print(f"{name:8s} {await measure(svc, login):8.1f} logins/s")
+    await svc.aclose()
+
+
+if __name__ == "__main__":
+    server = run_stub()
+    asyncio.run(main())
+    server.should_exit = True
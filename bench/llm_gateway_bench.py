@@ -0,0 +1,77 @@
+# LLM 게이트웨이 동작 확인: 버스트 상황에서 동시 호출 상한, 레인별 대기 시간, 같은 요약 요청 합치기
+# 응답마다 지연을 주는 가짜 채팅 모델을 쓰므로 외부 API 호출 없이 잰다.
+# 실행: python -m bench.llm_gateway_bench
+import asyncio
+import statistics
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from service.llm_gateway import BATCH, INTERACTIVE, LlmGateway
+
+MODEL_LATENCY = 0.05
+N_BATCH = 200
+N_INTERACTIVE = 50
+MAX_CONCURRENCY = 8
+RPM = 6000
+
+
+class SlowFakeChatModel(FakeListChatModel):
+    active: int = 0
+    peak: int = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(MODEL_LATENCY)
+            return await super().ainvoke(*args, **kwargs)
+        finally:
+            self.active -= 1
+
+
+def p95(values):
+    return statistics.quantiles(values, n=20)[-1]
+
+
+async def burst(gateway: LlmGateway | None):
+    model = SlowFakeChatModel(responses=["요약"])
+    waits = {INTERACTIVE: [], BATCH: []}
+
+    async def call(priority: int):
+        start = time.perf_counter()
+        if gateway is None:
+            waits[priority].append(0.0)
+            await model.ainvoke("안녕")
+            return
+        async with gateway.slot(priority, 500):
+            waits[priority].append((time.perf_counter() - start) * 1000)
+            await model.ainvoke("안녕")
+
+    # /summary 배치가 먼저 몰린 뒤 /chat 요청이 들어온다.
+    batch = [asyncio.create_task(call(BATCH)) for _ in range(N_BATCH)]
+    await asyncio.sleep(MODEL_LATENCY)
+    interactive = [asyncio.create_task(call(INTERACTIVE)) for _ in range(N_INTERACTIVE)]
+    await asyncio.gather(*batch, *interactive)
+    return model.peak, waits
+
+
+async def coalesce(gateway: LlmGateway):
+    model = SlowFakeChatModel(responses=["요약"])
+    await asyncio.gather(*(gateway.coalesce(("summary", 1), lambda: model.ainvoke("오늘")) for _ in range(20)))
+    return gateway.coalesced
+
+
+async def main():
+    peak, _ = await burst(None)
+    print(f"no gateway   peak in-flight {peak}")
+    gateway = LlmGateway(max_concurrency=MAX_CONCURRENCY, rpm=RPM, tpm=0)
+    peak, waits = await burst(gateway)
+    print(f"gateway      peak in-flight {peak} (limit {MAX_CONCURRENCY})")
+    for priority, name in ((INTERACTIVE, "interactive"), (BATCH, "batch")):
+        print(f"  {name:11s} wait p50 {statistics.median(waits[priority]):8.2f}ms   p95 {p95(waits[priority]):8.2f}ms")
+    print(f"coalesced {await coalesce(gateway)} of 20 identical summary calls")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+# API 콜드 스타트 시간과 워커 RSS 측정
+# 새 파이썬 프로세스에서 main 을 import 한 시간/메모리와, 감정 모델을 처음 로드한 뒤의 시간/메모리를 출력한다.
+# 실행: python -m bench.startup_bench
+import json
+import os
+import subprocess
+import sys
+
+CHILD = r"""
+import json, resource, time
+start = time.perf_counter()
+import main
+import_time = time.perf_counter() - start
+import_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+start = time.perf_counter()
+main.model_registry.get("emotion")
+load_time = time.perf_counter() - start
+loaded_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"import_time": import_time, "import_rss": import_rss, "load_time": load_time, "loaded_rss": loaded_rss}))
+"""
+N_RUNS = 3
+
+
+def main():
+    results = []
+    for _ in range(N_RUNS):
+        out = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, check=True, env={**os.environ, "MODEL_WARMUP": "0"})
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    best = min(results, key=lambda r: r["import_time"])
+    print(f"cold start (import main, 서빙 가능 시점): {best['import_time']:6.2f}s  RSS {best['import_rss']:7.0f}MB")
+    print(f"첫 감정 모델 로드:                      {best['load_time']:6.2f}s  RSS {best['loaded_rss']:7.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
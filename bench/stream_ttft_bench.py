@@ -0,0 +1,76 @@
+# /chat 스트림에서 첫 답변 토큰(delta)과 final 이벤트까지의 시간 비교
+# 토큰마다 지연을 주는 가짜 채팅 모델을 쓰므로 외부 API 호출 없이 잰다.
+# delta 이전에는 final 이 곧 사용자가 답변을 처음 보는 시점이었다.
+# 실행: python -m bench.stream_ttft_bench
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("OPEN_AI_API_KEY", "sk-fake")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from service.chat_service import ChatService
+
+N_REQUESTS = 20
+TOKEN_DELAY = 0.02
+ANSWER = " ".join(["푹 쉬는 것이 좋아요."] * 30)
+
+
+class SlowFakeChatModel(GenericFakeChatModel):
+    token_delay: float = TOKEN_DELAY
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    async def _astream(self, *args, **kwargs):
+        async for chunk in super()._astream(*args, **kwargs):
+            await asyncio.sleep(self.token_delay)
+            yield chunk
+
+
+class FakeRepo:
+    async def insert_chat(self, content, final_answer, user, db):
+        return [
+            SimpleNamespace(chat_id=0, user_code=user.user_code, role="human", content=content, create_at=None),
+            SimpleNamespace(chat_id=1, user_code=user.user_code, role="ai", content=final_answer, create_at=None),
+        ]
+
+
+async def main():
+    svc = ChatService()
+    svc.repo = FakeRepo()
+    svc.llm = SlowFakeChatModel(messages=itertools.cycle([AIMessage(content=ANSWER)]))
+    svc.chat_model_tools = []
+    user = SimpleNamespace(user_code=1)
+
+    first_delta, final = [], []
+    deltas = 0
+    for _ in range(N_REQUESTS):
+        start = time.perf_counter()
+        delta_at = final_at = None
+        async for line in svc.response_llm("요즘 잠이 안 와요", [], user, None):
+            event = json.loads(line)
+            now = (time.perf_counter() - start) * 1000
+            if event["type"] == "delta":
+                deltas += 1
+                if delta_at is None:
+                    delta_at = now
+            elif event["type"] == "final":
+                final_at = now
+        first_delta.append(delta_at)
+        final.append(final_at)
+
+    print(f"delta events/request {deltas / N_REQUESTS:.0f}")
+    print(f"first delta p50 {statistics.median(first_delta):8.2f}ms")
+    print(f"final       p50 {statistics.median(final):8.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+# 로컬 벡터 인덱스 vs Atlas $vectorSearch: recall@k 와 p50/p99 지연시간 비교
+# Atlas 결과를 정답으로 보고 로컬 top-k 가 얼마나 같은 청크를 찾는지 확인한다.
+# 실행: python -m bench.vector_index_bench
+import asyncio
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db.mongodb import MentalHealthVectorDb
+from db.vector_index import LocalVectorIndex
+from service.embedding_service import get_embedding_service
+
+QUERIES = [
+    "우울할 때 어떻게 해?",
+    "잠이 안 올 때는 어떻게 해야 해?",
+    "불안해서 숨이 막혀요",
+    "공황장애 증상이 뭐야?",
+    "요즘 아무것도 하기 싫어",
+    "스트레스를 줄이는 방법 알려줘",
+    "자존감이 너무 낮아요",
+    "화가 날 때 감정을 조절하는 법",
+    "친구 관계 때문에 너무 힘들어",
+    "상담을 받아야 할지 모르겠어",
+]
+K = 5
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def key(doc):
+    return doc["text"]
+
+
+async def main():
+    db = MentalHealthVectorDb()
+    docs = await db.fetch_all()
+    index = LocalVectorIndex.build([doc.pop("embedding") for doc in docs], docs)
+    print(f"chunks: {len(index)}")
+
+    embedder = get_embedding_service()
+    vectors = [await embedder.embed_query(q) for q in QUERIES]
+
+    recalls, local_ms, atlas_ms = [], [], []
+    for vector in vectors:
+        start = time.perf_counter()
+        atlas = await db.vector_search(vector, limit=K)
+        atlas_ms.append((time.perf_counter() - start) * 1000)
+
+        for _ in range(20):
+            start = time.perf_counter()
+            local = index.search(vector, K)
+            local_ms.append((time.perf_counter() - start) * 1000)
+
+        expected = {key(d) for d in atlas}
+        recalls.append(len(expected & {key(d) for d in local}) / max(1, len(expected)))
+
+    print(f"recall@{K} vs Atlas: {statistics.mean(recalls):.3f}")
+    print(f"local  p50 {percentile(local_ms, 50):8.3f}ms  p99 {percentile(local_ms, 99):8.3f}ms")
+    print(f"atlas  p50 {percentile(atlas_ms, 50):8.3f}ms  p99 {percentile(atlas_ms, 99):8.3f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
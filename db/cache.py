@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LruCache:
+    """
+    크기 제한(LRU)과 만료 시간(TTL)을 가진 프로세스 내 캐시입니다.
+    ttl 이 None 이면 만료 없이 크기 제한으로만 밀려납니다. set 할 때 항목별 ttl 을 따로 줄 수 있습니다.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expire_at, value = item
+            if expire_at is not None and expire_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        expire_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expire_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class MemoryCacheBackend:
+    """LruCache 를 async 캐시 인터페이스(get/set/delete)로 감싼 백엔드"""
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.cache = LruCache(maxsize, ttl)
+
+    async def get(self, key: str):
+        return self.cache.get(key)
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        self.cache.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        self.cache.delete(key)
+
+
+class RedisCacheBackend:
+    """
+    Redis 호환 서버를 쓰는 백엔드. 값은 JSON 으로 저장되며 워커 프로세스끼리 공유됩니다.
+    redis 패키지가 필요합니다. (pip install redis)
+    """
+    def __init__(self, url: str, prefix: str = ""):
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value, ttl: float | None = None):
+        # 1초 미만 ttl 이 ex=0 이 되어 Redis 가 거부하지 않도록 밀리초 단위로, 최소 1ms 로 준다.
+        px = max(1, int(ttl * 1000)) if ttl is not None else None
+        await self.client.set(self.prefix + key, json.dumps(value, ensure_ascii=False), px=px)
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+
+def create_cache_backend(prefix: str, maxsize: int = 1024, ttl: float | None = None):
+    # REDIS_URL 이 있으면 Redis, 없으면 프로세스 내 LRU 를 쓴다.
+    url = os.getenv("REDIS_URL")
+    if url:
+        return RedisCacheBackend(url, prefix)
+    return MemoryCacheBackend(maxsize, ttl)
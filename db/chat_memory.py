@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+import numpy as np
+
+ROLE_NAMES = {"human": "user", "ai": "assistant"}
+
+
+class ChatMemory(ABC):
+    """
+    사용자별 대화 벡터 메모리 인터페이스입니다.
+    저장과 검색은 항상 user_code 단위로 나뉘어 있어서, 검색은 그 사용자의 벡터만 훑습니다.
+    item 은 {"chat_id", "role", "content", "create_at", "embedding"} 형태입니다.
+    """
+    @abstractmethod
+    async def add(self, user_code: int, items: list[dict]):
+        ...
+
+    @abstractmethod
+    async def search(self, user_code: int, embedded_query, limit: int = 5) -> list[dict]:
+        ...
+
+
+class _UserVectors:
+    def __init__(self):
+        # 정규화된 벡터를 행렬 하나로만 들고 있는다. (docs 와 같은 순서)
+        self.matrix: np.ndarray | None = None
+        self.docs: list[dict] = []
+        self.chat_ids: set[int] = set()
+        # MariaDB 에서 이 chat_id 까지 읽어 왔다. None 이면 아직 한 번도 안 읽었다.
+        self.synced_chat_id: int | None = None
+
+    def __len__(self):
+        return len(self.docs)
+
+
+class LocalChatMemory(ChatMemory):
+    """
+    프로세스 메모리에 사용자별 NumPy 행렬을 두는 백엔드.
+    - 사용자별 벡터는 CHAT_MEMORY_DIR/<user_code>.npz 에 저장해 두고(CHAT_MEMORY_SAVE_DELAY 초마다 모아서), 재시작하거나 다른 워커가
+      처음 검색할 때 파일에서 읽습니다. 같은 대화를 다시 임베딩하지 않습니다.
+    - 파일에 없는 새 대화(chat_id 기준)는 검색할 때 백그라운드로 loader 에서 읽어 임베딩합니다. 요청은 기다리지 않고 지금 있는 벡터로
+      검색하며, 따라잡은 대화는 다음 검색부터 보입니다. (파일이 없으면 최근 CHAT_MEMORY_BACKFILL 개부터)
+    - 전체 벡터 수가 CHAT_MEMORY_MAX_VECTORS 를 넘으면 가장 오래 안 쓴 사용자부터 메모리에서 비웁니다.
+    """
+    def __init__(
+        self,
+        loader: Callable[[int, int, int], Awaitable[list[dict]]] | None = None,
+        embed: Callable[[list[str]], Awaitable[list[list[float]]]] | None = None,
+        max_per_user: int | None = None,
+        max_vectors: int | None = None,
+        backfill: int | None = None,
+        path: str | None = None,
+    ):
+        self.loader = loader
+        self.embed = embed
+        self.max_per_user = max_per_user or int(os.getenv("CHAT_MEMORY_MAX_PER_USER", "5000"))
+        self.max_vectors = max_vectors or int(os.getenv("CHAT_MEMORY_MAX_VECTORS", "20000"))
+        self.backfill = backfill or int(os.getenv("CHAT_MEMORY_BACKFILL", "1000"))
+        self.path = path or os.getenv("CHAT_MEMORY_DIR", ".model_cache/chat_memory")
+        self.save_delay = float(os.getenv("CHAT_MEMORY_SAVE_DELAY", "5"))
+        self._users: OrderedDict[int, _UserVectors] = OrderedDict()
+        self._total = 0
+        self._syncs: dict[int, asyncio.Task] = {}
+        self._saves: dict[int, asyncio.Task] = {}
+
+    def _file(self, user_code: int) -> str:
+        return os.path.join(self.path, f"{user_code}.npz")
+
+    def _load(self, user_code: int) -> _UserVectors:
+        user = _UserVectors()
+        path = self._file(user_code)
+        if not os.path.exists(path):
+            return user
+        try:
+            with np.load(path) as data:
+                matrix = data["matrix"]
+                meta = json.loads(str(data["meta"]))
+        except Exception as e:
+            print(f"대화 메모리 파일을 읽지 못해 다시 만듭니다 ({path}): {e}")
+            return user
+        if len(meta["docs"]) == len(matrix):
+            user.matrix = matrix if len(matrix) else None
+            user.docs = meta["docs"]
+            user.chat_ids = {doc["chat_id"] for doc in user.docs}
+            user.synced_chat_id = meta["synced_chat_id"]
+        return user
+
+    def _save(self, user_code: int, matrix: np.ndarray | None, docs: list[dict], synced_chat_id: int | None):
+        # 임시 파일에 쓰고 바꿔 넣어서 읽는 쪽이 반쯤 쓴 파일을 보지 않게 한다.
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(user_code)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        meta = json.dumps({"synced_chat_id": synced_chat_id, "docs": docs}, ensure_ascii=False, default=str)
+        with open(tmp, "wb") as f:
+            np.savez(f, matrix=matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32), meta=np.array(meta))
+        os.replace(tmp, path)
+
+    def _schedule_save(self, user_code: int, user: _UserVectors):
+        if user_code not in self._saves:
+            self._saves[user_code] = asyncio.create_task(self._save_later(user_code, user))
+
+    async def _save_later(self, user_code: int, user: _UserVectors):
+        await asyncio.sleep(self.save_delay)
+        # 여기부터 생기는 변경은 다음 저장이 맡는다.
+        self._saves.pop(user_code, None)
+        try:
+            await asyncio.to_thread(self._save, user_code, user.matrix, list(user.docs), user.synced_chat_id)
+        except Exception as e:
+            print(f"대화 메모리 저장 실패 (user {user_code}): {e}")
+
+    async def _user(self, user_code: int) -> _UserVectors:
+        user = self._users.get(user_code)
+        if user is None:
+            loaded = await asyncio.to_thread(self._load, user_code)
+            # 읽는 사이에 다른 요청이 먼저 넣었으면 그쪽을 쓴다.
+            user = self._users.get(user_code)
+            if user is None:
+                user = self._put(user_code, loaded)
+        self._users.move_to_end(user_code)
+        return user
+
+    def _put(self, user_code: int, user: _UserVectors) -> _UserVectors:
+        old = self._users.pop(user_code, None)
+        self._total += len(user) - (len(old) if old is not None else 0)
+        self._users[user_code] = user
+        self._evict(user_code)
+        return user
+
+    def _append(self, user_code: int, user: _UserVectors, items: list[dict]):
+        items = [item for item in items if item["chat_id"] not in user.chat_ids]
+        if not items:
+            return
+        if self._users.get(user_code) is not user:
+            # 백그라운드로 채우는 동안 비워진 사용자. 다시 넣고 개수를 맞춘다.
+            self._put(user_code, user)
+        vectors = np.asarray([item["embedding"] for item in items], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        before = len(user)
+        user.matrix = vectors if user.matrix is None else np.vstack([user.matrix, vectors])
+        user.docs += [{k: v for k, v in item.items() if k != "embedding"} for item in items]
+        user.chat_ids.update(item["chat_id"] for item in items)
+        if len(user) > self.max_per_user:
+            for doc in user.docs[:-self.max_per_user]:
+                user.chat_ids.discard(doc["chat_id"])
+            user.matrix = user.matrix[-self.max_per_user:].copy()
+            del user.docs[:-self.max_per_user]
+        self._total += len(user) - before
+        self._evict(user_code)
+        self._schedule_save(user_code, user)
+
+    def _evict(self, keep: int):
+        while self._total > self.max_vectors and len(self._users) > 1:
+            user_code, user = next(iter(self._users.items()))
+            if user_code == keep:
+                break
+            del self._users[user_code]
+            self._total -= len(user)
+
+    def _start_sync(self, user_code: int, user: _UserVectors):
+        if user_code not in self._syncs:
+            task = asyncio.create_task(self._sync(user_code, user))
+            self._syncs[user_code] = task
+            task.add_done_callback(lambda _: self._syncs.pop(user_code, None))
+
+    async def _sync(self, user_code: int, user: _UserVectors):
+        try:
+            after = user.synced_chat_id or 0
+            limit = self.max_per_user if user.synced_chat_id is not None else self.backfill
+            rows = await self.loader(user_code, after, limit)
+            # add() 로 이미 들어온 행은 다시 임베딩하지 않는다.
+            new = [row for row in rows if row["chat_id"] not in user.chat_ids and row["content"]]
+            if new:
+                embeddings = await self.embed([row["content"] for row in new])
+                self._append(user_code, user, [{**row, "embedding": e} for row, e in zip(new, embeddings)])
+            synced = max([after, *(row["chat_id"] for row in rows)])
+            if synced != user.synced_chat_id:
+                user.synced_chat_id = synced
+                self._schedule_save(user_code, user)
+        except Exception as e:
+            print(f"대화 메모리 동기화 실패 (user {user_code}): {e}")
+
+    async def add(self, user_code: int, items: list[dict]):
+        if items:
+            self._append(user_code, await self._user(user_code), items)
+
+    async def search(self, user_code: int, embedded_query, limit: int = 5) -> list[dict]:
+        user = await self._user(user_code)
+        if self.loader is not None and self.embed is not None:
+            self._start_sync(user_code, user)
+        if not user.docs:
+            return []
+        q = np.asarray(embedded_query, dtype=np.float32)
+        scores = user.matrix @ (q / (np.linalg.norm(q) or 1.0))
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [{**user.docs[i], "score": float(scores[i])} for i in top]
+
+
+class MongoChatMemory(ChatMemory):
+    """
+    chatbot.chat_memory 컬렉션에 저장하는 백엔드.
+    Atlas 벡터 인덱스(chat_memory_index)에 userCode 를 filter 필드로 선언해야 사용자별 pre-filter 검색이 된다.
+    """
+    def __init__(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
+        self.collection = client["chatbot"]["chat_memory"]
+
+    async def add(self, user_code: int, items: list[dict]):
+        if items:
+            await self.collection.insert_many([
+                {
+                    "userCode": user_code,
+                    "chatId": item["chat_id"],
+                    "role": item["role"],
+                    "content": item["content"],
+                    "createAt": item["create_at"],
+                    "embedding": list(map(float, item["embedding"])),
+                }
+                for item in items
+            ])
+
+    async def search(self, user_code: int, embedded_query, limit: int = 5) -> list[dict]:
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": "chat_memory_index",
+                    "path": "embedding",
+                    "queryVector": list(map(float, embedded_query)),
+                    "filter": {"userCode": user_code},
+                    "numCandidates": limit * 20,
+                    "limit": limit
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "chat_id": "$chatId",
+                    "role": 1,
+                    "content": 1,
+                    "create_at": "$createAt",
+                    "score": {"$meta": "vectorSearchScore"}
+                }
+            }
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=limit)
+
+
+class SupabaseChatMemory(ChatMemory):
+    """
+    Supabase(pgvector) chat 테이블을 쓰는 백엔드.
+    vector_search_by_user RPC 는 db/supabase_vector_search_by_user.sql 로 만든다. (user_code 로 먼저 거른 뒤 거리순)
+    """
+    def __init__(self):
+        from db.supabase_db import SupabaseClient
+        self.client = SupabaseClient()
+
+    async def add(self, user_code: int, items: list[dict]):
+        for item in items:
+            await asyncio.to_thread(
+                self.client.insert_chat, user_code, item["content"], list(map(float, item["embedding"])), ROLE_NAMES.get(item["role"], item["role"])
+            )
+
+    async def search(self, user_code: int, embedded_query, limit: int = 5) -> list[dict]:
+        return await asyncio.to_thread(self.client.vector_search_by_user, user_code, list(map(float, embedded_query)), limit)
+
+
+def create_chat_memory(loader=None, embed=None) -> ChatMemory:
+    # loader(user_code, after_chat_id, limit), embed(texts) 는 local 백엔드가 MariaDB 대화로 메모리를 채울 때 쓴다.
+    backend = os.getenv("CHAT_MEMORY_BACKEND", "local")
+    if backend == "local":
+        return LocalChatMemory(loader, embed)
+    if backend == "mongo":
+        return MongoChatMemory()
+    if backend == "supabase":
+        return SupabaseChatMemory()
+    raise ValueError(f"지원하지 않는 CHAT_MEMORY_BACKEND 입니다: {backend}")
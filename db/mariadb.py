@@ -1,89 +1,67 @@
-import os
-import aiomysql
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from typing import Optional, Dict, Any
 
-class MariaAnalysisRepo:
-    def __init__(self):
-        self.host = os.getenv("MARIADB_HOST")
-        self.port = int(os.getenv("MARIADB_PORT", "3306"))
-        self.db = os.getenv("MARIADB_DB")
-        self.user = os.getenv("MARIADB_USER")
-        self.password = os.getenv("MARIADB_PASSWORD")
-        self.pool = None
+from pytz import timezone
+from sqlalchemy import text
 
-    async def init_pool(self):
-        if not self.pool:
-            self.pool = await aiomysql.create_pool(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                db=self.db,
-                charset="utf8mb4",
-                cursorclass=aiomysql.DictCursor,
-                autocommit=True,
-            )
+from db.mariadb_orm import engine
 
-    async def close(self):
-        if self.pool:
-            self.pool.close()
-            await self.pool.wait_closed()
+# 대화와 분석 결과의 날짜 기준 시간대. chat/chat_emotion 의 create_at, analysis_day, "오늘" 범위를 모두 이 시계로 만든다.
+ANALYSIS_TZ = timezone("Asia/Seoul")
+
+
+def analysis_now() -> datetime:
+    # create_at, analysis_day, 오늘 범위를 만들 때 쓰는 현재 시각 (ANALYSIS_TZ, tzinfo 없는 값)
+    return datetime.now(ANALYSIS_TZ).replace(tzinfo=None)
 
-    async def get_latest_by_user_and_date(self, user_code: int, target_date: date) -> Optional[Dict[str, Any]]:
-        if not self.pool:
-             await self.init_pool()
-        async with self.pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                sql = """
-                SELECT analysis_code, user_code, emotion_score, emotion_name, summary, create_at
-                FROM analysis_result
-                WHERE user_code = %s AND DATE(create_at) = %s
-                ORDER BY create_at DESC
-                LIMIT 1
-                """
-                await cur.execute(sql, (user_code, target_date.strftime("%Y-%m-%d")))
-                row = await cur.fetchone()
-                return row
 
-    async def insert(self, user_code: int, emotion_score: float, emotion_name: str, summary: str, create_at: datetime) -> int:
-        if not self.pool:
-             await self.init_pool()
-        async with self.pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                sql = """
-                INSERT INTO analysis_result (user_code, emotion_score, emotion_name, summary, create_at)
-                VALUES (%s, %s, %s, %s, %s)
-                """
-                await cur.execute(
-                    sql,
-                    (
-                        user_code,
-                        float(emotion_score),
-                        (emotion_name[:25] if summary is not None else None),
-                        (summary[:3000] if summary is not None else None),
-                        create_at,
-                    ),
-                )
-                return cur.lastrowid
+class MariaAnalysisRepo:
+    def __init__(self):
+        # ORM 과 같은 커넥션 풀을 쓴다.
+        self.engine = engine
+
+    async def get_latest_by_user_and_date(self, user_code: int, target_date: date) -> Optional[Dict[str, Any]]:
+        sql = """
+        SELECT analysis_code, user_code, emotion_score, emotion_name, summary, create_at
+        FROM analysis_result
+        WHERE user_code = :user_code AND create_at >= :start AND create_at < :end
+        ORDER BY create_at DESC
+        LIMIT 1
+        """
+        # DATE(create_at) 대신 범위 조건으로 (user_code, create_at) 인덱스를 탄다.
+        start = datetime.combine(target_date, time.min)
+        async with self.engine.connect() as conn:
+            r = await conn.execute(text(sql), {"user_code": user_code, "start": start, "end": start + timedelta(days=1)})
+            row = r.mappings().first()
+            return dict(row) if row else None
 
-    async def update(self, analysis_code: int, emotion_score: float, emotion_name: str, summary: str, create_at: datetime) -> None:
-        if not self.pool:
-             await self.init_pool()
-        async with self.pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                sql = """
-                UPDATE analysis_result
-                SET emotion_score=%s, emotion_name=%s, summary=%s, create_at=%s
-                WHERE analysis_code=%s
-                """
-                await cur.execute(
-                    sql,
-                    (
-                        float(emotion_score),
-                        (emotion_name or "")[:25],
-                        (summary[:3000] if summary is not None else None),
-                        create_at,
-                        analysis_code,
-                    ),
-                )
+    async def upsert(self, user_code: int, analysis_day: date, create_at: datetime, emotion_score: float | None = None, emotion_name: str | None = None, summary: str | None = None, update_emotion: bool = False, update_summary: bool = False) -> None:
+        """
+        (user_code, analysis_day) 유니크 키 기준으로 한 번의 INSERT ... ON DUPLICATE KEY UPDATE 를 실행합니다.
+        이미 행이 있으면 update_emotion / update_summary 로 고른 컬럼만 덮어씁니다.
+        """
+        updates = []
+        if update_emotion:
+            updates += ["emotion_score=VALUES(emotion_score)", "emotion_name=VALUES(emotion_name)", "create_at=VALUES(create_at)"]
+        if update_summary:
+            updates += ["summary=VALUES(summary)"]
+        if not updates:
+            # 기존 행은 그대로 둔다.
+            updates = ["analysis_code=analysis_code"]
+        params = {
+            "user_code": user_code,
+            "analysis_day": analysis_day,
+            "emotion_name": (emotion_name or "")[:25],
+            "summary": (summary[:3000] if summary is not None else None),
+            "create_at": create_at,
+        }
+        # 요약만 저장할 때는 emotion_score 컬럼을 건드리지 않는다. (ORM 스키마에는 없는 컬럼)
+        if update_emotion or emotion_score is not None:
+            params["emotion_score"] = float(emotion_score or 0.0)
+        sql = f"""
+        INSERT INTO analysis_result ({", ".join(params)})
+        VALUES ({", ".join(":" + name for name in params)})
+        ON DUPLICATE KEY UPDATE {", ".join(updates)}
+        """
+        async with self.engine.begin() as conn:
+            await conn.execute(text(sql), params)
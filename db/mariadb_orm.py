@@ -1,36 +1,126 @@
 import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 
 load_dotenv()
-DATABASE_URL = (
-    f"mysql+asyncmy://{os.getenv('MARIADB_USER')}:"
-    f"{os.getenv('MARIADB_PASSWORD')}@"
-    f"{os.getenv('MARIADB_HOST')}:{os.getenv('MARIADB_PORT', '3306')}/"
-    f"{os.getenv('MARIADB_DB')}?charset=utf8mb4"
-)
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,
-)
+
+def _database_url(host: str | None) -> str:
+    return (
+        f"mysql+asyncmy://{os.getenv('MARIADB_USER')}:"
+        f"{os.getenv('MARIADB_PASSWORD')}@"
+        f"{host}:{os.getenv('MARIADB_PORT', '3306')}/"
+        f"{os.getenv('MARIADB_DB')}?charset=utf8mb4"
+    )
+
+DATABASE_URL = _database_url(os.getenv('MARIADB_HOST'))
+# 읽기 전용 복제본. 설정하지 않으면 get_read_db 도 primary 를 쓴다.
+REPLICA_URL = _database_url(os.getenv('MARIADB_REPLICA_HOST')) if os.getenv('MARIADB_REPLICA_HOST') else None
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """커넥션을 빌릴 때까지 기다린 시간과 타임아웃 횟수를 기록하는 풀"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def metrics(self) -> dict:
+        return {
+            "pool_size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def _create_engine(url: str):
+    return create_async_engine(
+        url,
+        echo=os.getenv("DB_ECHO", "0") == "1",
+        pool_pre_ping=True,
+        poolclass=MeteredQueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    )
+
+# 모든 repo(ORM, raw SQL)가 공유하는 단일 풀
+engine = _create_engine(DATABASE_URL)
+replica_engine = _create_engine(REPLICA_URL) if REPLICA_URL else None
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+ReadSessionLocal = async_sessionmaker(
+    bind=replica_engine or engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
 
 class Base(DeclarativeBase):
     pass
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+async def check_db_revision():
+    # 스키마는 alembic upgrade head 로만 바꾼다. create_all 은 기존 테이블에 컬럼을 추가하지 못하므로,
+    # 마이그레이션이 빠진 DB 로 떠서 INSERT 때 실패하는 대신 시작할 때 멈춘다.
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(root, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(root, "migrations"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    async with engine.connect() as conn:
+        try:
+            current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+        except ProgrammingError:
+            current = set()
+    if current != heads:
+        raise RuntimeError(
+            f"DB 스키마가 최신이 아닙니다 (현재 {sorted(current) or '없음'}, 필요 {sorted(heads)}). alembic upgrade head 를 먼저 실행하세요."
+        )
 
 async def get_db():
     async with AsyncSessionLocal() as db:
-        yield db
\ No newline at end of file
+        yield db
+
+async def get_read_db():
+    # 조금 늦어도 되는 조회(캘린더, 채팅 스크롤)용 세션. MARIADB_REPLICA_HOST 가 있으면 복제본으로 보낸다.
+    async with ReadSessionLocal() as db:
+        yield db
+
+def get_pool_metrics() -> dict:
+    metrics = {"primary": engine.pool.metrics()}
+    if replica_engine is not None:
+        metrics["replica"] = replica_engine.pool.metrics()
+    return metrics
@@ -5,6 +5,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from bson import ObjectId
 
+from db.vector_index import corpus_fingerprint
+
 class Mongodb:
     def __init__(self):
         url = os.getenv("MONGODB_URI")
@@ -18,7 +20,7 @@ class Mongodb:
             f["convId"] = conv_id
         return f
 
-    async def get_chat_history(self, user_code, conv_id, year=None, month=None, day=None, limit=None):
+    def _day_query(self, user_code, conv_id, year=None, month=None, day=None):
         now = datetime.now()
         year = year or now.year
         month = month or now.month
@@ -27,7 +29,7 @@ class Mongodb:
         start = datetime(year, month, day)
         end = start + timedelta(days=1)
 
-        query = {
+        return {
             **self._filter(user_code, ObjectId(conv_id)),
             "createAt": {
                 "$gte": start,
@@ -35,6 +37,18 @@ class Mongodb:
             },
         }
 
+    async def get_chat_history(self, user_code, conv_id, year=None, month=None, day=None, limit=None, after_id=None, until_id=None):
+        query = self._day_query(user_code, conv_id, year, month, day)
+        id_range = {}
+        if after_id is not None:
+            # after_id 메시지 이후에 추가된 메시지만
+            id_range["$gt"] = ObjectId(after_id)
+        if until_id is not None:
+            # until_id 메시지까지만. 읽는 사이에 추가된 메시지는 빼서 기준 id 와 맞춘다.
+            id_range["$lte"] = ObjectId(until_id)
+        if id_range:
+            query["_id"] = id_range
+
         if limit:
             cursor = self.chat_collection.find(query).sort("createAt", -1).limit(limit)
             docs = await cursor.to_list(length=limit)
@@ -53,6 +67,62 @@ class Mongodb:
                 out.append(AIMessage(content=content))
         return out
 
+    async def get_last_message_id(self, user_code, conv_id, year=None, month=None, day=None) -> str | None:
+        query = self._day_query(user_code, conv_id, year, month, day)
+        doc = await self.chat_collection.find_one(query, {"_id": 1}, sort=[("createAt", -1), ("_id", -1)])
+        return str(doc["_id"]) if doc else None
+
     async def add_message(self, message, user_code, conv_id):
         role = "user" if isinstance(message, HumanMessage) else "assistant"
         await self.chat_collection.insert_one({"convId": ObjectId(conv_id),"content":message.content,"createAt":datetime.now(), "role":role,"userCode":user_code})
+
+
+class MentalHealthVectorDb:
+    def __init__(self):
+        url = os.getenv("MONGO")
+        # 프로세스 전체가 공유하는 커넥션 풀. 도구 호출마다 새 클라이언트를 만들지 않는다.
+        client = AsyncIOMotorClient(
+            url,
+            maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+            minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "2")),
+            maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_MS", "60000")),
+            serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        )
+        db = client["mentalcare_chat_bot"]
+        self.collection = db["docs"]
+
+    async def vector_search(self, embedded_query, limit: int = 5, num_candidates: int = 100) -> list[dict]:
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": "vector_index",
+                    "path": "embedding",
+                    "queryVector": embedded_query,
+                    "numCandidates": num_candidates,
+                    "limit": limit
+                }
+            },
+            {
+                # embedding(1536차원)은 돌려받지 않는다.
+                "$project": {
+                    "_id": 0,
+                    "text": 1,
+                    "metadata": 1,
+                    "score": {
+                        "$meta": "vectorSearchScore"
+                    }
+                }
+            }
+        ]
+        cursor = self.collection.aggregate(pipeline)
+        return await cursor.to_list(length=limit)
+
+    async def fetch_all(self) -> list[dict]:
+        # 로컬 인덱스를 만들기 위해 모든 청크를 임베딩과 함께 가져온다.
+        cursor = self.collection.find({}, {"_id": 0, "text": 1, "metadata": 1, "embedding": 1})
+        return await cursor.to_list(length=None)
+
+    async def fingerprint(self) -> dict:
+        # 저장된 로컬 인덱스가 최신인지 확인하는 값. 임베딩은 읽지 않는다.
+        cursor = self.collection.find({}, {"_id": 0, "text": 1, "metadata.content_hash": 1})
+        return corpus_fingerprint(await cursor.to_list(length=None))
@@ -40,3 +40,17 @@ class SupabaseClient:
                 out.append(AIMessage(content=content))
         print(out)
         return out
+
+    def vector_search_by_user(self, user_code: int, embedded_query, match_count: int) -> list[dict]:
+        '''
+        한 사용자의 대화만 대상으로 벡터 유사도 검색을 수행합니다.
+        :param user_code: 검색 대상 사용자입니다. RPC 안에서 이 사용자의 행만 거리 계산합니다.
+        :param embedded_query: 사용자의 질문을 임베딩한 벡터 값으로 1536차원입니다.
+        :param match_count: 총 몇 개를 반환할지
+        :return: {"role", "content", "create_at", "score"} dict 배열입니다.
+        '''
+        result = self.client.rpc("vector_search_by_user", {"p_user_code": user_code, "q": embedded_query, "match_count": match_count}).execute()
+        return [
+            {"role": r["role"], "content": r["content"], "create_at": r.get("create_at"), "score": r.get("similarity")}
+            for r in result.data
+        ]
@@ -0,0 +1,22 @@
+-- CHAT_MEMORY_BACKEND=supabase 가 쓰는 RPC. Supabase SQL Editor 에서 한 번 실행한다.
+-- chat(user_code, content, encode_content vector(1536), create_at, role) 테이블 기준
+
+-- user_code 로 먼저 좁힌 뒤 그 사용자 행만 거리 계산을 한다.
+create index if not exists chat_user_code_idx on chat (user_code);
+
+-- encode_content 에 HNSW/IVFFlat 인덱스가 있으면 플래너가 벡터 인덱스를 먼저 타고 user_code 를 나중에 걸러
+-- match_count 개보다 적게 돌려줄 수 있다. materialized CTE 로 사용자 행을 먼저 고정한다.
+create or replace function vector_search_by_user(p_user_code bigint, q vector(1536), match_count int)
+returns table (role text, content text, create_at timestamptz, similarity float8)
+language sql stable
+as $$
+  with mine as materialized (
+    select c.role, c.content, c.create_at, c.encode_content
+    from chat c
+    where c.user_code = p_user_code
+  )
+  select m.role::text, m.content::text, m.create_at::timestamptz, (1 - (m.encode_content <=> q))::float8 as similarity
+  from mine m
+  order by m.encode_content <=> q
+  limit match_count;
+$$;
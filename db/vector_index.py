@@ -0,0 +1,85 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+def corpus_fingerprint(docs: list[dict]) -> dict:
+    # 문서 수와 청크 해시(없는 예전 문서는 본문 해시) 목록의 해시. 컬렉션이 바뀌면 값이 달라진다.
+    keys = sorted(
+        (doc.get("metadata") or {}).get("content_hash") or hashlib.sha256(doc.get("text", "").encode("utf-8")).hexdigest()
+        for doc in docs
+    )
+    return {"count": len(keys), "hash": hashlib.sha256("\n".join(keys).encode()).hexdigest()}
+
+
+class LocalVectorIndex:
+    """
+    문서 청크 임베딩을 프로세스 안에 올려 두는 벡터 인덱스입니다.
+    정규화된 float32 행렬과 내적으로 top-k 를 구하고, 저장된 .npy 파일은 memory-map 으로 읽습니다.
+    """
+    def __init__(self, matrix: np.ndarray, docs: list[dict], fingerprint: dict | None = None):
+        self.matrix = matrix
+        self.docs = docs
+        # 인덱스를 만든 컬렉션의 corpus_fingerprint. 저장된 파일이 최신인지 비교할 때 쓴다.
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, vectors, docs: list[dict]) -> "LocalVectorIndex":
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return cls(matrix / norms, docs, corpus_fingerprint(docs))
+
+    def save(self, path: str):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path.with_suffix(".npy"), self.matrix)
+        with open(path.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump(self.docs, f, ensure_ascii=False, default=str)
+        with open(path.with_suffix(".meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LocalVectorIndex":
+        path = Path(path)
+        matrix = np.load(path.with_suffix(".npy"), mmap_mode="r" if mmap else None)
+        with open(path.with_suffix(".json"), encoding="utf-8") as f:
+            docs = json.load(f)
+        return cls(matrix, docs, cls.load_fingerprint(path))
+
+    @staticmethod
+    def load_fingerprint(path: str) -> dict | None:
+        path = Path(path).with_suffix(".meta.json")
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("fingerprint")
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        path = Path(path)
+        return path.with_suffix(".npy").exists() and path.with_suffix(".json").exists()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def search(self, query_vector, limit: int = 5) -> list[dict]:
+        if len(self.docs) == 0:
+            return []
+        q = np.asarray(query_vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        scores = self.matrix @ q
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        # Atlas $vectorSearch(cosine) 의 vectorSearchScore 와 같은 (1 + cos) / 2 스케일로 돌려준다.
+        return [
+            {
+                "text": self.docs[i]["text"],
+                "metadata": self.docs[i].get("metadata"),
+                "score": float((1.0 + scores[i]) / 2.0),
+            }
+            for i in top
+        ]
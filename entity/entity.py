@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import datetime, date
 
-from sqlalchemy import BigInteger, String, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import BigInteger, String, DateTime, Date, Boolean, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from db.mariadb_orm import Base
@@ -20,6 +20,8 @@ class User(Base):
     role: Mapped[str] = mapped_column(String(20), nullable=False)
     oauth_provider: Mapped[str] = mapped_column(String(100), nullable=True)
     refresh_token: Mapped[str] = mapped_column(String(3000), nullable=True)
+    # 현재 유효한 refresh token 의 sha256 hex. 토큰 원문은 저장하지 않는다.
+    refresh_token_hash: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
     chats: Mapped[list["Chat"]] = relationship(
         "Chat",
         back_populates="user",
@@ -33,6 +35,10 @@ class User(Base):
 
 class Chat(Base):
     __tablename__ = 'chat'
+    __table_args__ = (
+        # 유저별 최신순 조회와 (create_at, chat_id) 커서 페이지네이션용
+        Index('ix_chat_user_create_id', 'user_code', 'create_at', 'chat_id'),
+    )
     chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     user_code: Mapped[int] = mapped_column(BigInteger, ForeignKey('user.user_code'), nullable=False)
     content: Mapped[str] = mapped_column(String(6000), nullable=True)
@@ -46,6 +52,12 @@ class Chat(Base):
 
 class AnalysisResult(Base):
     __tablename__ = 'analysis_result'
+    __table_args__ = (
+        # 유저별 날짜/월 범위 조회용
+        Index('ix_analysis_result_user_create', 'user_code', 'create_at'),
+        # 유저당 하루 한 행. INSERT ... ON DUPLICATE KEY UPDATE 의 기준 키
+        UniqueConstraint('user_code', 'analysis_day', name='uq_analysis_result_user_day'),
+    )
     analysis_code: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     happy: Mapped[float] = mapped_column(Float, nullable=True)
     anger:Mapped[float] = mapped_column(Float, nullable=True)
@@ -54,9 +66,42 @@ class AnalysisResult(Base):
     calmness: Mapped[float] = mapped_column(Float, nullable=True)
     confusion: Mapped[float] = mapped_column(Float, nullable=True)
     create_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    analysis_day: Mapped[date] = mapped_column(Date, nullable=False)
     emotion_name: Mapped[str] = mapped_column(String(100), nullable=False)
     summary: Mapped[str] = mapped_column(String(6000), nullable=True)
     user_code: Mapped[int] = mapped_column(BigInteger, ForeignKey('user.user_code'), nullable=False)
     user: Mapped[User] = relationship("User", back_populates="analysis_result")
     def __repr__(self):
         return f"Chat(analysis_code: {self.analysis_code}, create_at: {self.create_at}, emotion_name: {self.emotion_name}, summary: {self.summary}, user_code: {self.user_code})"
+
+
+class ChatEmotion(Base):
+    __tablename__ = 'chat_emotion'
+    __table_args__ = (
+        Index('ix_chat_emotion_user_create', 'user_code', 'create_at'),
+    )
+    chat_id: Mapped[int] = mapped_column(BigInteger, ForeignKey('chat.chat_id'), primary_key=True, autoincrement=False)
+    user_code: Mapped[int] = mapped_column(BigInteger, ForeignKey('user.user_code'), nullable=False)
+    happy: Mapped[float] = mapped_column(Float, nullable=False)
+    anger: Mapped[float] = mapped_column(Float, nullable=False)
+    anxiety: Mapped[float] = mapped_column(Float, nullable=False)
+    sadness: Mapped[float] = mapped_column(Float, nullable=False)
+    calmness: Mapped[float] = mapped_column(Float, nullable=False)
+    confusion: Mapped[float] = mapped_column(Float, nullable=False)
+    # 원본 chat 의 create_at. 하루 단위 합산 시 chat 과 같은 기준으로 자른다.
+    create_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"ChatEmotion(chat_id: {self.chat_id}, user_code: {self.user_code}, create_at: {self.create_at})"
+
+
+class ChatSummary(Base):
+    __tablename__ = 'chat_summary'
+    # 유저별 롤링 대화 요약. last_chat_id 까지의 대화가 summary 에 반영되어 있다.
+    user_code: Mapped[int] = mapped_column(BigInteger, ForeignKey('user.user_code'), primary_key=True, autoincrement=False)
+    summary: Mapped[str] = mapped_column(String(6000), nullable=False)
+    last_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    update_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"ChatSummary(user_code: {self.user_code}, last_chat_id: {self.last_chat_id}, update_at: {self.update_at})"
@@ -0,0 +1,41 @@
+# 멘탈 케어 문서 증분 적재
+# 사용: python ingest.py data.txt [more.txt ...] [--source mental_health_guide] [--no-prune] [--export-index]
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db.mongodb import MentalHealthVectorDb
+from db.vector_index import LocalVectorIndex
+from service.embedding_service import get_embedding_service
+from service.ingest_service import IngestService
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+")
+    # 기존 코퍼스의 source. 다른 값으로 적재하면 prune 이 기존 문서를 지우지 않아 같은 내용이 두 벌 남는다.
+    parser.add_argument("--source", default="mental_health_guide", help="metadata.source 값 (기본 mental_health_guide)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--no-prune", action="store_true", help="소스에서 사라진 청크를 지우지 않는다.")
+    parser.add_argument("--export-index", action="store_true", help="적재 후 로컬 벡터 인덱스 파일을 다시 만든다.")
+    args = parser.parse_args()
+
+    db = MentalHealthVectorDb()
+    service = IngestService(db.collection, get_embedding_service(), args.batch_size, args.concurrency)
+    stats = await service.ingest(args.paths, args.source, prune=not args.no_prune)
+    print(f"[{args.source}] 청크 {stats['chunks']}개, 기존 {stats['skipped']}개 건너뜀, 임베딩 {stats['embedded']}개, 저장 {stats['upserted']}개, 삭제 {stats['deleted']}개")
+
+    if args.export_index:
+        docs = await db.fetch_all()
+        index = LocalVectorIndex.build([doc.pop("embedding") for doc in docs], docs)
+        index.save(os.getenv("VECTOR_INDEX_PATH", ".model_cache/mental_health_index"))
+        print(f"로컬 인덱스 저장: {len(index)}개 청크")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,6 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 import fastapi
 import uvicorn
@@ -7,11 +9,11 @@ from starlette.responses import RedirectResponse, StreamingResponse
 
 from dto.token import DecodedToken
 from entity.entity import User, AnalysisResult
-from db.mariadb_orm import get_db, init_db
+from db.mariadb_orm import get_db, get_read_db, get_pool_metrics, check_db_revision
 from dto.kakao_response import KaKaoTokenResponse, KaKaoUserResponse
 from service.emotion_service import EmotionService
 from service.login_service import LoginService
-from service.login_service import get_user
+from service.login_service import get_user, token_cache
 load_dotenv(".env")
 
 from fastapi import FastAPI, Cookie
@@ -19,27 +21,61 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.params import Depends
 from pytz import timezone
 from dto.requests import ChatRequest, SummaryRequest
-from service.chat_service import ChatService
-import torch    # pip3 install torch torchvision --index-url https://download.pytorch.org/whl/cpu
+from service.chat_service import ChatService, load_mental_health_index
+from service.chat_persister import ChatPersister
+from service.analysis_worker import AnalysisWorker
+from service.summary_service import SummaryService, SummaryWorker
+from service.job_queue import LocalJobQueue
+from model.registry import model_registry
+from model.llm import LlmModel
+from db.mongodb import Mongodb
+from db.mariadb import MariaAnalysisRepo
+from service.llm_gateway import get_llm_gateway
 from entity.entity import Chat
 from sqlalchemy.ext.asyncio import AsyncSession
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 seoul_tz = timezone("Asia/Seoul")
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 CORS = os.getenv("CORS")
 
-chat_service = ChatService()
+analysis_queue = LocalJobQueue(maxsize=int(os.getenv("ANALYSIS_QUEUE_SIZE", "1000")))
+chat_persister = ChatPersister()
+summary_svc = SummaryService(LocalJobQueue(maxsize=int(os.getenv("SUMMARY_QUEUE_SIZE", "1000"))))
+summary_worker = SummaryWorker(summary_svc)
+chat_service = ChatService(analysis_queue, chat_persister, summary_svc)
 svc = LoginService()
 emotion_svc = EmotionService()
+analysis_worker = AnalysisWorker(analysis_queue, emotion_svc)
+llm_model = LlmModel(Mongodb(), MariaAnalysisRepo(), emotion_svc.calendar_cache)
 
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     await init_db()
-#     yield
-# app = FastAPI(lifespan=lifespan)
-app = FastAPI()
+# gunicorn --preload 처럼 fork 전에 import 되는 경우, 미리 로드해 두면 워커끼리 가중치 메모리를 copy-on-write 로 공유한다.
+if os.getenv("MODEL_PRELOAD") == "1":
+    model_registry.preload()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await check_db_revision()
+    # 모델 로드는 readiness 를 막지 않도록 백그라운드에서 진행한다.
+    warmup = asyncio.create_task(model_registry.warmup()) if os.getenv("MODEL_WARMUP", "1") == "1" else None
+    # 로컬 벡터 인덱스가 준비되기 전까지 멘탈 케어 검색은 Atlas 로 처리된다.
+    index_task = asyncio.create_task(load_mental_health_index()) if os.getenv("LOCAL_VECTOR_INDEX", "1") == "1" else None
+    # 지난 실행에서 저장하지 못한 대화(spill 파일)를 다시 넣고 flush 루프를 시작한다.
+    await chat_persister.start()
+    analysis_worker.start()
+    summary_worker.start()
+    yield
+    # 남은 대화를 먼저 저장해야 그 분석/요약 작업까지 워커가 마저 처리한다.
+    await chat_persister.stop()
+    await analysis_worker.stop()
+    await summary_worker.stop()
+    await svc.aclose()
+    # warm-up / 인덱스 로드가 아직 끝나지 않았으면 기다리지 않고 취소한다.
+    background = [task for task in (warmup, index_task) if task is not None]
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=[CORS],allow_credentials=True,allow_methods=["*"],allow_headers=["*"])
 
 @app.get("/auth/me")
@@ -48,28 +84,26 @@ async def me(user:DecodedToken=Depends(get_user), db:AsyncSession = Depends(get_
 @app.post("/chat")
 async def chat(req: ChatRequest, user:DecodedToken=Depends(get_user), db:AsyncSession=Depends(get_db)):
     print(req)
-    chats: list[Chat] = await chat_service.get_chats(db, user, 10)
+    chat_summary, chats = await chat_service.get_history(db, user, 10)
     return StreamingResponse(
-        chat_service.response_llm(req.content, chats, user, db),
+        chat_service.response_llm(req.content, chats, user, db, summary=chat_summary),
         media_type="application/x-ndjson"
     )
 @app.get("/chat")
-async def get_chat(page: int = 0, user:DecodedToken=Depends(get_user), db:AsyncSession=Depends(get_db)):
-    # 유저의 chat 가져오기
-    r = await chat_service.get_chats_by_page(db, user, page)
+async def get_chat(page: int = 0, before: str | None = None, user:DecodedToken=Depends(get_user), db:AsyncSession=Depends(get_read_db)):
+    # 유저의 chat 가져오기. before(이전 응답의 next_cursor)가 있으면 page 대신 커서로 이어서 가져온다.
+    r = await chat_service.get_chats_by_page(db, user, page, before=before)
     return r
 
 @app.post("/summary")
-async def summary(req: SummaryRequest, user:User=Depends(get_user)):
-    return await chat_service.summary(req, user.user_code)
+async def summary(req: SummaryRequest, user:DecodedToken=Depends(get_user)):
+    # 그날 대화가 바뀌지 않았으면 캐시된 일기를, 몇 개만 늘었으면 이전 일기에 새 대화만 반영해서 돌려준다.
+    return await llm_model.summary(user.user_code, req.convId, req.year, req.month, req.day)
 
 @app.get("/analyze")
-async def analyze(year:int, month:int, user:DecodedToken=Depends(get_user), db:AsyncSession=Depends(get_db)):
-    chat_history:list[Chat] = await emotion_svc.get_today_chats(user, db)
-    if len(chat_history) != 0:
-        today_analyze:dict = await emotion_svc.today_analyze_chat(chat_history)
-        await emotion_svc.insert_today_emotion(today_analyze, user, db)
-    calendar_data:list[AnalysisResult] = await emotion_svc.get_calendar_data(year, month, user, db)
+async def analyze(year:int, month:int, user:DecodedToken=Depends(get_user), db:AsyncSession=Depends(get_read_db)):
+    # 감정 분석은 /chat 저장 후 분석 워커가 백그라운드로 갱신한다.
+    calendar_data:list[dict] = await emotion_svc.get_calendar_data(year, month, user, db)
     return calendar_data
 
 @app.get("/login")
@@ -78,8 +112,8 @@ async def login(code:str|None=None, error:str|None=None, error_description:str|N
         print(error)
         print(error_description)
     else:
-        kakao_token: KaKaoTokenResponse = svc.get_kakao_token(code)
-        kakao_user: KaKaoUserResponse = svc.get_kakao_user(kakao_token.access_token)
+        kakao_token: KaKaoTokenResponse = await svc.fetch_kakao_token(code)
+        kakao_user: KaKaoUserResponse = await svc.fetch_kakao_user(kakao_token.access_token)
         k_id = str(kakao_user.id)
         props = kakao_user.properties
         user = await svc.is_exist_user(kakao_user, db)
@@ -98,6 +132,16 @@ async def refresh(response: fastapi.Response,refill_rt: str | None = Cookie(defa
     return new_access_token
 
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "db_pool": get_pool_metrics(),
+        "calendar_cache": emotion_svc.calendar_cache.stats(),
+        "chat_context": chat_service.context_builder.stats(),
+        "token_cache": token_cache.stats(),
+        "llm_gateway": get_llm_gateway().stats(),
+    }
+
 @app.get("/test")
 def test(user=Depends(get_user)):
     print(user)
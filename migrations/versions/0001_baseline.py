@@ -0,0 +1,66 @@
+"""baseline: user, chat, analysis_result
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 예전 init_db(create_all) 로 이미 만들어진 DB 에서도 돌 수 있도록 없는 테이블만 만든다.
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("user"):
+        op.create_table(
+            "user",
+            sa.Column("user_code", sa.BigInteger, primary_key=True, autoincrement=True),
+            sa.Column("oauth_id", sa.String(100), nullable=False),
+            sa.Column("nickname", sa.String(100), nullable=False),
+            sa.Column("name", sa.String(100), nullable=False),
+            sa.Column("create_at", sa.DateTime, nullable=False),
+            sa.Column("enable", sa.Boolean, nullable=False),
+            sa.Column("last_login_time", sa.DateTime, nullable=True),
+            sa.Column("email", sa.String(100), nullable=True, unique=True),
+            sa.Column("profile_img", sa.String(300), nullable=True),
+            sa.Column("bio", sa.String(100), nullable=True),
+            sa.Column("role", sa.String(20), nullable=False),
+            sa.Column("oauth_provider", sa.String(100), nullable=True),
+            sa.Column("refresh_token", sa.String(3000), nullable=True),
+        )
+        op.create_index("ix_user_oauth_id", "user", ["oauth_id"], unique=True)
+    if not inspector.has_table("chat"):
+        op.create_table(
+            "chat",
+            sa.Column("chat_id", sa.BigInteger, primary_key=True, autoincrement=True),
+            sa.Column("user_code", sa.BigInteger, sa.ForeignKey("user.user_code"), nullable=False),
+            sa.Column("content", sa.String(6000), nullable=True),
+            sa.Column("role", sa.String(20), nullable=False),
+            sa.Column("create_at", sa.DateTime, nullable=False),
+        )
+    if not inspector.has_table("analysis_result"):
+        op.create_table(
+            "analysis_result",
+            sa.Column("analysis_code", sa.BigInteger, primary_key=True, autoincrement=True),
+            sa.Column("happy", sa.Float, nullable=True),
+            sa.Column("anger", sa.Float, nullable=True),
+            sa.Column("anxiety", sa.Float, nullable=True),
+            sa.Column("sadness", sa.Float, nullable=True),
+            sa.Column("calmness", sa.Float, nullable=True),
+            sa.Column("confusion", sa.Float, nullable=True),
+            sa.Column("create_at", sa.DateTime, nullable=False),
+            sa.Column("emotion_name", sa.String(100), nullable=False),
+            sa.Column("summary", sa.String(6000), nullable=True),
+            sa.Column("user_code", sa.BigInteger, sa.ForeignKey("user.user_code"), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("analysis_result")
+    op.drop_table("chat")
+    op.drop_table("user")
@@ -0,0 +1,52 @@
+"""chat_emotion table and composite indexes for chat / analysis_result hot queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (테이블, 인덱스 이름, 컬럼)
+INDEXES = [
+    # get_chats / get_chats_by_page / get_chats_by_cursor / get_today_chat
+    ("chat", "ix_chat_user_create_id", ["user_code", "create_at", "chat_id"]),
+    # get_calendar_data / insert_today_emotion / get_latest_by_user_and_date
+    ("analysis_result", "ix_analysis_result_user_create", ["user_code", "create_at"]),
+]
+
+
+def _has_index(inspector, table: str, name: str) -> bool:
+    return any(ix["name"] == name for ix in inspector.get_indexes(table))
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("chat_emotion"):
+        op.create_table(
+            "chat_emotion",
+            sa.Column("chat_id", sa.BigInteger, sa.ForeignKey("chat.chat_id"), primary_key=True, autoincrement=False),
+            sa.Column("user_code", sa.BigInteger, sa.ForeignKey("user.user_code"), nullable=False),
+            sa.Column("happy", sa.Float, nullable=False),
+            sa.Column("anger", sa.Float, nullable=False),
+            sa.Column("anxiety", sa.Float, nullable=False),
+            sa.Column("sadness", sa.Float, nullable=False),
+            sa.Column("calmness", sa.Float, nullable=False),
+            sa.Column("confusion", sa.Float, nullable=False),
+            sa.Column("create_at", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_chat_emotion_user_create", "chat_emotion", ["user_code", "create_at"])
+    for table, name, columns in INDEXES:
+        if not _has_index(inspector, table, name):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, _ in INDEXES:
+        op.drop_index(name, table_name=table)
+    op.drop_table("chat_emotion")
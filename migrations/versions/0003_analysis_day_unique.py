@@ -0,0 +1,53 @@
+"""analysis_result.analysis_day with unique (user_code, analysis_day)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("analysis_result")}
+    if "analysis_day" not in columns:
+        op.add_column("analysis_result", sa.Column("analysis_day", sa.Date, nullable=True))
+    op.execute("UPDATE analysis_result SET analysis_day = DATE(create_at) WHERE analysis_day IS NULL")
+    # 예전 SELECT 후 INSERT 경쟁으로 생긴 같은 날 중복 행은 가장 최근 행만 남긴다.
+    # 지우기 전에, 남길 행에 없는 값은 그 값을 가진 가장 최근 중복 행에서 옮겨 둔다.
+    # (일기 요약과 감정 분석이 서로 다른 행을 만들었을 수 있다.)
+    for check, columns in (
+        ("summary", ["summary"]),
+        ("emotion_name", ["emotion_name", "happy", "anger", "anxiety", "sadness", "calmness", "confusion"]),
+    ):
+        assignments = ", ".join(f"keep_row.{c} = src.{c}" for c in columns)
+        op.execute(
+            "UPDATE analysis_result keep_row "
+            "JOIN ("
+            "  SELECT MAX(analysis_code) AS keep_code, "
+            f"  MAX(CASE WHEN {check} IS NOT NULL THEN analysis_code END) AS src_code "
+            "  FROM analysis_result GROUP BY user_code, analysis_day HAVING COUNT(*) > 1"
+            ") d ON keep_row.analysis_code = d.keep_code "
+            "JOIN analysis_result src ON src.analysis_code = d.src_code "
+            f"SET {assignments} "
+            f"WHERE keep_row.{check} IS NULL"
+        )
+    op.execute(
+        "DELETE a FROM analysis_result a "
+        "JOIN analysis_result b ON a.user_code = b.user_code AND a.analysis_day = b.analysis_day "
+        "AND a.analysis_code < b.analysis_code"
+    )
+    op.alter_column("analysis_result", "analysis_day", existing_type=sa.Date, nullable=False)
+    if not any(uc["name"] == "uq_analysis_result_user_day" for uc in inspector.get_unique_constraints("analysis_result")):
+        op.create_unique_constraint("uq_analysis_result_user_day", "analysis_result", ["user_code", "analysis_day"])
+
+
+def downgrade():
+    op.drop_constraint("uq_analysis_result_user_day", "analysis_result", type_="unique")
+    op.drop_column("analysis_result", "analysis_day")
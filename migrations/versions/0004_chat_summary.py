@@ -0,0 +1,29 @@
+"""chat_summary table for rolling per-user conversation summaries
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("chat_summary"):
+        op.create_table(
+            "chat_summary",
+            sa.Column("user_code", sa.BigInteger, sa.ForeignKey("user.user_code"), primary_key=True, autoincrement=False),
+            sa.Column("summary", sa.String(6000), nullable=False),
+            sa.Column("last_chat_id", sa.BigInteger, nullable=False),
+            sa.Column("update_at", sa.DateTime, nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("chat_summary")
@@ -0,0 +1,33 @@
+"""user.refresh_token_hash replaces the stored refresh token
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("user")}
+    if "refresh_token_hash" not in columns:
+        op.add_column("user", sa.Column("refresh_token_hash", sa.String(64), nullable=True))
+    # hashlib.sha256(token).hexdigest() 와 같은 값. 이후 원문은 지운다.
+    op.execute(
+        "UPDATE `user` SET refresh_token_hash = SHA2(refresh_token, 256), refresh_token = NULL "
+        "WHERE refresh_token IS NOT NULL AND refresh_token <> ''"
+    )
+    if not any(ix["name"] == "ix_user_refresh_token_hash" for ix in inspector.get_indexes("user")):
+        op.create_index("ix_user_refresh_token_hash", "user", ["refresh_token_hash"])
+
+
+def downgrade():
+    # 원문이 남아 있지 않으므로 기존 refresh token 은 다시 로그인해야 한다.
+    op.drop_index("ix_user_refresh_token_hash", table_name="user")
+    op.drop_column("user", "refresh_token_hash")
@@ -0,0 +1,140 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 개발 환경. 워커 하나만 띄운다고 보고 잠그지 않는다.
+    fcntl = None
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+# torch: PyTorch fp32, int8: PyTorch dynamic int8 양자화,
+# onnx: 내보낸 ONNX 그래프를 onnxruntime 으로 서빙, onnx_int8: ONNX 그래프를 int8 로 동적 양자화
+BACKENDS = ("torch", "int8", "onnx", "onnx_int8")
+ONNX_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+class SequenceClassifier:
+    """
+    Hugging Face 문장 분류 모델을 선택한 CPU 추론 백엔드로 감싼 클래스입니다.
+    onnx 계열 백엔드는 처음 로드할 때 MODEL_CACHE_DIR 아래로 그래프를 내보내고, 이후에는 캐시된 파일만 읽습니다.
+    """
+    def __init__(self, model_path: str, backend: str | None = None, device="cpu", max_length: int | None = None):
+        self.backend = backend or os.getenv("EMOTION_BACKEND", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"지원하지 않는 추론 백엔드입니다: {self.backend}")
+        self.model_path = model_path
+        self.device = device if self.backend == "torch" else "cpu"
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.max_length = max_length or min(self.tokenizer.model_max_length, 512)
+        self.id2label = AutoConfig.from_pretrained(model_path).id2label
+        self.model = None
+        self.session = None
+
+        if self.backend in ("onnx", "onnx_int8"):
+            self.session = self._load_onnx()
+        else:
+            model = AutoModelForSequenceClassification.from_pretrained(model_path)
+            model.eval()
+            if self.backend == "int8":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.model = model.to(self.device)
+
+    def _onnx_path(self) -> Path:
+        cache_dir = Path(os.getenv("MODEL_CACHE_DIR", ".model_cache")) / self.model_path.replace("/", "__")
+        return cache_dir / ("model.int8.onnx" if self.backend == "onnx_int8" else "model.onnx")
+
+    @staticmethod
+    def _tmp_path(path: Path) -> Path:
+        # 같은 디렉터리의 임시 파일에 쓰고 os.replace 로 바꿔 넣어서, 읽는 쪽이 반쯤 쓴 파일을 열지 않게 한다.
+        return path.with_name(f"{path.stem}.{os.getpid()}.tmp{path.suffix}")
+
+    @staticmethod
+    @contextmanager
+    def _cache_lock(cache_dir: Path):
+        # 여러 워커가 동시에 콜드 스타트해도 한 워커만 내보내고 나머지는 끝난 파일을 읽는다.
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_dir / ".lock", "w") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _export_onnx(self, path: Path):
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_path)
+        model.eval()
+        dummy = self.tokenizer(["모델 내보내기용 문장입니다."], return_tensors="pt")
+        input_names = [name for name in ONNX_INPUTS if name in dummy]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        tmp = self._tmp_path(path)
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in input_names),
+                str(tmp),
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+            )
+        os.replace(tmp, path)
+
+    def _load_onnx(self):
+        import onnxruntime as ort
+
+        path = self._onnx_path()
+        if not path.exists():
+            with self._cache_lock(path.parent):
+                # 잠금을 기다리는 사이 다른 워커가 만들었을 수 있다.
+                fp32_path = path.with_name("model.onnx")
+                if not fp32_path.exists():
+                    self._export_onnx(fp32_path)
+                if not path.exists():
+                    from onnxruntime.quantization import quantize_dynamic, QuantType
+                    tmp = self._tmp_path(path)
+                    quantize_dynamic(str(fp32_path), str(tmp), weight_type=QuantType.QInt8)
+                    os.replace(tmp, path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = os.getenv("ORT_THREADS")
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.onnx_inputs = [i.name for i in session.get_inputs()]
+        return session
+
+    def _predict_batch(self, texts: list[str]) -> np.ndarray:
+        if self.session is not None:
+            enc = self.tokenizer(texts, return_tensors="np", truncation=True, padding=True, max_length=self.max_length)
+            feeds = {name: enc[name].astype(np.int64) for name in self.onnx_inputs}
+            logits = self.session.run(["logits"], feeds)[0]
+            logits = logits - logits.max(axis=-1, keepdims=True)
+            exp = np.exp(logits)
+            return exp / exp.sum(axis=-1, keepdims=True)
+
+        enc = self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=self.max_length).to(self.device)
+        with torch.inference_mode():
+            logits = self.model(**enc).logits
+        return torch.softmax(logits, dim=-1).float().cpu().numpy()
+
+    def predict_proba(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        # 길이순으로 묶어 배치 안의 패딩을 줄이고, 결과는 원래 순서로 되돌린다.
+        out = np.zeros((len(texts), len(self.id2label)), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._predict_batch([texts[i] for i in idx])
+        return out
+
+    def predict(self, texts: list[str], batch_size: int = 32) -> list[list[dict]]:
+        # transformers pipeline(top_k=None) 과 같은 [{label, score}, ...] 형태
+        probs = self.predict_proba(texts, batch_size)
+        return [
+            [{"label": self.id2label[i], "score": float(p)} for i, p in enumerate(row)]
+            for row in probs
+        ]
@@ -1,15 +1,17 @@
 import inspect
 import os
-from datetime import datetime
-from pytz import timezone
+from datetime import date, datetime
 
 from starlette.responses import StreamingResponse
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai import ChatOpenAI
 
+from db.cache import create_cache_backend
+from service.llm_gateway import BATCH, estimate_tokens, get_llm_gateway, usage_tokens
+
 class LlmModel:
-    def __init__(self, mongodb, mariadb):
+    def __init__(self, mongodb, mariadb, calendar_cache=None):
         key = os.getenv("OPEN_AI_API_KEY")
         summary_prompt = ChatPromptTemplate.from_messages(
             [
@@ -23,6 +25,15 @@ class LlmModel:
                 ("human", "이 history를 기반으로 모두 대화를 요약하고, 내 관점에서 제목, 날짜를 작성하고,일기를 마크다운 문법으로 작성해줘."),
             ]
         )
+        # 이미 쓴 일기에 그 뒤의 대화만 반영해서 다시 쓰는 프롬프트
+        incremental_summary_prompt = ChatPromptTemplate.from_messages(
+            [
+                summary_prompt.messages[0],
+                ("human", "[기존 일기]\n{summary}"),
+                MessagesPlaceholder("history"),
+                ("human", "history 는 기존 일기를 쓴 뒤에 나눈 대화야. 새 내용을 반영해서 같은 형식(제목, 날짜, 마크다운)으로 일기 전체를 다시 작성해줘."),
+            ]
+        )
         prompt = ChatPromptTemplate.from_messages(
             [
                 (
@@ -37,9 +48,17 @@ class LlmModel:
         self.llm = ChatOpenAI(model="gpt-4.1-nano", openai_api_key=key)
         self._chain = prompt | self.llm
         self._summary_chain = summary_prompt | self.llm
+        self._incremental_summary_chain = incremental_summary_prompt | self.llm
+        # (user_code, conv_id, 날짜) -> {"last_message_id", "summary"}. 마지막 메시지가 같으면 그대로 돌려준다.
+        self._summary_cache = create_cache_backend(
+            "diary:",
+            maxsize=int(os.getenv("DIARY_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("DIARY_CACHE_TTL", "172800")),
+        )
+        self._incremental_max = int(os.getenv("DIARY_INCREMENTAL_MAX", "40"))
+        self._calendar_cache = calendar_cache
         self._mongo = mongodb
         self._maria = mariadb
-        self._seoul_tz = timezone("Asia/Seoul")
 
     async def chat(self, message:str, rag_history:list, user_code:int, conv_id, is_streaming=False, is_jailbreak=False, callback=None):
         recent_messages = await self._mongo.get_chat_history(user_code, conv_id, limit=10)
@@ -102,26 +121,51 @@ class LlmModel:
             return text
 
     async def summary(self, user_code, conv_id, year, month, day):
-        past = await self._mongo.get_chat_history(user_code, conv_id, year, month, day)
-        result = await self._summary_chain.ainvoke({"history": past})
-        summary_text = (result.content or "").strip()
+        # 같은 날짜의 요약 요청이 동시에 오면 LLM 호출 하나를 함께 기다린다.
+        return await get_llm_gateway().coalesce(
+            ("summary", user_code, conv_id, year, month, day),
+            lambda: self._summary(user_code, conv_id, year, month, day),
+        )
+
+    async def _summary(self, user_code, conv_id, year, month, day):
+        key = f"{user_code}:{conv_id}:{year}-{month:02d}-{day:02d}"
+        last_message_id = await self._mongo.get_last_message_id(user_code, conv_id, year, month, day)
+        cached = await self._summary_cache.get(key)
+        if cached is not None and cached["last_message_id"] == last_message_id:
+            return cached["summary"]
 
-        latest = await self._maria.get_latest_by_user_and_date(user_code=user_code, target_date=datetime(year, month, day, tzinfo=self._seoul_tz).date())
-        create_at = datetime(year, month, day, tzinfo=self._seoul_tz).replace(tzinfo=None)
-        if latest and latest.get("analysis_code"):
-            await self._maria.update(
-                analysis_code=int(latest["analysis_code"]),
-                emotion_score=float(latest.get("emotion_score") or 0.0),
-                emotion_name=latest.get("emotion_name") or "",
-                summary=summary_text,
-                create_at=create_at,
+        delta = None
+        if cached is not None and cached["last_message_id"] is not None:
+            delta = await self._mongo.get_chat_history(
+                user_code, conv_id, year, month, day, after_id=cached["last_message_id"], until_id=last_message_id
             )
+        if delta and len(delta) <= self._incremental_max:
+            # 이전 요약 이후에 추가된 메시지가 몇 개뿐이면 전체 대화 대신 이전 요약 + 새 메시지로 다시 쓴다.
+            history = delta
+            chain, inputs = self._incremental_summary_chain, {"summary": cached["summary"], "history": delta}
         else:
-            await self._maria.insert(
-                user_code=user_code,
-                emotion_score=0.0,
-                emotion_name="",
-                summary=summary_text,
-                create_at=create_at,
-            )
+            # 요약은 last_message_id 까지의 대화로 만든다. 그 뒤에 온 메시지는 다음 요청의 delta 가 된다.
+            history = await self._mongo.get_chat_history(user_code, conv_id, year, month, day, until_id=last_message_id)
+            chain, inputs = self._summary_chain, {"history": history}
+
+        gateway = get_llm_gateway()
+        estimated = estimate_tokens([inputs.get("summary", ""), *history])
+        # 일기 요약은 batch 우선순위라 /chat 호출이 먼저 처리된다.
+        async with gateway.slot(BATCH, estimated):
+            result = await chain.ainvoke(inputs)
+        gateway.settle(estimated, usage_tokens(result))
+        summary_text = (result.content or "").strip()
+
+        # 요청한 날짜가 곧 analysis_day 이다. (db.mariadb.ANALYSIS_TZ 기준 날짜)
+        await self._maria.upsert(
+            user_code=user_code,
+            analysis_day=date(year, month, day),
+            create_at=datetime(year, month, day),
+            summary=summary_text,
+            update_summary=True,
+        )
+        await self._summary_cache.set(key, {"last_message_id": last_message_id, "summary": summary_text})
+        if self._calendar_cache is not None:
+            # 캘린더 응답에 summary 가 들어 있으므로 그 달 캐시를 비운다.
+            await self._calendar_cache.invalidate(user_code, year, month)
         return summary_text
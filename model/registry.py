@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from typing import Any, Callable
+
+
+class ModelRegistry:
+    """
+    무거운 모델을 처음 쓸 때 한 번만 로드해서 프로세스 안에서 공유하는 레지스트리입니다.
+    모델 팩토리 안에서 torch / transformers 를 import 하므로, 모델을 쓰지 않는 요청은 로드 비용을 내지 않습니다.
+    """
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._models: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        self._factories[name] = factory
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is None:
+            # 로드는 executor 스레드에서 일어날 수 있으므로 스레드 락으로 중복 로드를 막는다.
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._factories[name]()
+                    self._models[name] = model
+        return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def preload(self, *names: str):
+        for name in names or tuple(self._factories):
+            self.get(name)
+
+    async def warmup(self, *names: str):
+        # 이벤트 루프를 막지 않고 스레드에서 미리 로드한다.
+        # 기본 executor 대신 daemon 스레드를 쓰므로, 로드 중에 종료해도 루프 종료가 로드가 끝나기를 기다리지 않는다.
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def finish(error: BaseException | None):
+            if done.done():
+                return
+            if error is not None:
+                done.set_exception(error)
+            else:
+                done.set_result(None)
+
+        def run():
+            error = None
+            try:
+                self.preload(*names)
+            except BaseException as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(finish, error)
+            except RuntimeError:
+                # 이미 루프가 닫혔다.
+                pass
+
+        threading.Thread(target=run, name="model-warmup", daemon=True).start()
+        try:
+            await done
+        except Exception as e:
+            print(f"모델 warm-up 실패: {e}")
+
+
+def _emotion_classifier():
+    from model.classifier import SequenceClassifier
+    # 추론 백엔드는 EMOTION_BACKEND (torch / int8 / onnx / onnx_int8) 로 고른다.
+    return SequenceClassifier("Seonghaa/korean-emotion-classifier-roberta")
+
+
+model_registry = ModelRegistry()
+model_registry.register("emotion", _emotion_classifier)
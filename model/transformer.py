@@ -1,10 +1,8 @@
 import asyncio
-from datetime import datetime
 from bson import ObjectId
 from langchain_core.messages import HumanMessage
-from pytz import timezone
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+from db.mariadb import analysis_now
+from model.classifier import SequenceClassifier
 
 class TransformerModel:
     def __init__(self, mongodb, mariadb, device):
@@ -26,15 +24,12 @@ class TransformerModel:
             4: "맑음",
             5: "최고",
         }
-        self.seoul_tz = timezone("Asia/Seoul")
         model_path = "LimYeri/HowRU-KoELECTRA-Emotion-Classifier"
         self.mongodb = mongodb
         self.mariadb = mariadb
         self.device = device
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        self.emotion_model = AutoModelForSequenceClassification.from_pretrained(model_path).to(device)
-        self.emotion_model.eval()
-        self.id2label = self.emotion_model.config.id2label
+        self.classifier = SequenceClassifier(model_path, device=device, max_length=128)
+        self.id2label = self.classifier.id2label
 
     def _score_to_weather(self, score: float) -> str:
         s = int(round(score))
@@ -43,60 +38,37 @@ class TransformerModel:
     def _clamp_0_5(self, x: float) -> float:
         return max(0.0, min(5.0, x))
 
-    def _analyze_emotion_score(self, text: str):
-        inputs = self.tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=128
-        ).to(self.device)
-
-        with torch.no_grad():
-            outputs = self.emotion_model(**inputs)
-
-        probabilities = torch.softmax(outputs.logits, dim=1)[0]
-        probs_list = probabilities.tolist()
-
-        pred_id = int(torch.argmax(probabilities).item())
+    def _to_analysis(self, probs_list) -> dict:
+        pred_id = max(range(len(probs_list)), key=lambda i: probs_list[i])
         predicted_label = self.id2label[pred_id]
 
         score_0_5 = self._clamp_0_5(float(self.EMOTION_TO_SCORE_0_5.get(predicted_label, 3)))
-        scores = {self.id2label[i]: round(p * 100, 2) for i, p in enumerate(probs_list)}
+        scores = {self.id2label[i]: round(float(p) * 100, 2) for i, p in enumerate(probs_list)}
 
         return {
             "예측": predicted_label,
             "확률": scores,
             "척도값": score_0_5,
         }
-    async def update_db(self, user_code, final_score, overall_emotion_label):
-        target_date = datetime.now(self.seoul_tz).date()
-        create_at = datetime.now(self.seoul_tz).replace(tzinfo=None)
-        latest = await self.mariadb.get_latest_by_user_and_date(user_code=user_code, target_date=target_date)
-        if latest and latest.get("analysis_code"):
-            summary_keep = None if latest.get("summary") is None else latest.get("summary")
-            await self.mariadb.update(
-                analysis_code=int(latest["analysis_code"]),
-                emotion_score=final_score,
-                emotion_name=overall_emotion_label,
-                summary=summary_keep,
-                create_at=create_at,
-            )
-        else:
 
-            await self.mariadb.insert(
-                user_code=user_code,
-                emotion_score=final_score,
-                emotion_name=overall_emotion_label,
-                summary=None,
-                create_at=create_at,
-            )
+    def _analyze_emotion_score(self, text: str):
+        return self._to_analysis(self.classifier.predict_proba([text])[0])
+    async def update_db(self, user_code, final_score, overall_emotion_label):
+        now = analysis_now()
+        await self.mariadb.upsert(
+            user_code=user_code,
+            analysis_day=now.date(),
+            create_at=now,
+            emotion_score=final_score,
+            emotion_name=overall_emotion_label,
+            update_emotion=True,
+        )
 
     def _compute_inference(self, user_utterances):
         analysis_results = []
         total_scale_score = 0.0
-        for text in user_utterances:
-            analysis = self._analyze_emotion_score(text)
+        for text, probs_list in zip(user_utterances, self.classifier.predict_proba(user_utterances)):
+            analysis = self._to_analysis(probs_list)
             analysis_results.append(
                 {
                     "text": text,
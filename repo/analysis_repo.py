@@ -1,8 +1,10 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
-from sqlalchemy import select, update
+from sqlalchemy import select, insert, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
-from entity.entity import AnalysisResult
+from db.mariadb import analysis_now
+from entity.entity import AnalysisResult, ChatEmotion
 from sqlalchemy.ext.asyncio import AsyncSession
 
 class AnalysisRepo:
@@ -10,45 +12,59 @@ class AnalysisRepo:
         pass
 
     async def insert_today_emotion(self, today_analyze:dict, emotion_name, user_code, db:AsyncSession):
-        now = datetime.now()
-        start_of_day = datetime(now.year, now.month, now.day)
-        
+        # (user_code, analysis_day) 유니크 키로 한 번에 insert 또는 update 한다. 동시에 호출돼도 하루 한 행만 남는다.
+        now = analysis_now()
+        sql = mysql_insert(AnalysisResult).values(
+            happy=today_analyze.get('기쁨'),
+            anger=today_analyze.get('분노'),
+            anxiety=today_analyze.get('불안'),
+            sadness=today_analyze.get('슬픔'),
+            calmness=today_analyze.get('평온'),
+            confusion=today_analyze.get('당황'),
+            create_at=now,
+            analysis_day=now.date(),
+            emotion_name=emotion_name,
+            user_code=user_code,
+        )
+        sql = sql.on_duplicate_key_update(
+            happy=sql.inserted.happy,
+            anger=sql.inserted.anger,
+            anxiety=sql.inserted.anxiety,
+            sadness=sql.inserted.sadness,
+            calmness=sql.inserted.calmness,
+            confusion=sql.inserted.confusion,
+            emotion_name=sql.inserted.emotion_name,
+        )
+        await db.execute(sql)
+        await db.commit()
+
+    async def get_today_emotion_totals(self, user_code, db:AsyncSession):
+        # 오늘 이미 분류된 메시지의 라벨별 합계, 개수, 마지막 chat_id 를 한 번에 가져온다.
+        start = datetime.combine(analysis_now().date(), time.min)
+        end = start + timedelta(days=1)
         r = await db.execute(
-            select(AnalysisResult).where(
-                AnalysisResult.user_code == user_code,
-                AnalysisResult.create_at >= start_of_day
+            select(
+                func.count(ChatEmotion.chat_id).label("count"),
+                func.max(ChatEmotion.chat_id).label("last_chat_id"),
+                func.coalesce(func.sum(ChatEmotion.happy), 0).label("happy"),
+                func.coalesce(func.sum(ChatEmotion.anger), 0).label("anger"),
+                func.coalesce(func.sum(ChatEmotion.anxiety), 0).label("anxiety"),
+                func.coalesce(func.sum(ChatEmotion.sadness), 0).label("sadness"),
+                func.coalesce(func.sum(ChatEmotion.calmness), 0).label("calmness"),
+                func.coalesce(func.sum(ChatEmotion.confusion), 0).label("confusion"),
+            ).where(
+                ChatEmotion.user_code == user_code,
+                ChatEmotion.create_at >= start,
+                ChatEmotion.create_at < end
             )
         )
-        existing = r.scalars().first()
-        
-        if existing:
-            sql = (update(AnalysisResult).where(AnalysisResult.analysis_code == existing.analysis_code)
-                   .values(
-                happy=today_analyze.get('기쁨'),
-                anger=today_analyze.get('분노'),
-                anxiety=today_analyze.get('불안'),
-                sadness=today_analyze.get('슬픔'),
-                calmness=today_analyze.get('평온'),
-                confusion=today_analyze.get('당황'),
-                emotion_name=emotion_name,
-            )
-            )
-            await db.execute(sql)
-            await db.commit()
-        else:
-            data = AnalysisResult(
-                happy=today_analyze.get('기쁨'),
-                anger=today_analyze.get('분노'),
-                anxiety=today_analyze.get('불안'),
-                sadness=today_analyze.get('슬픔'),
-                calmness=today_analyze.get('평온'),
-                confusion=today_analyze.get('당황'),
-                create_at=datetime.now(),
-                emotion_name=emotion_name,
-                user_code=user_code,
-            )
-            db.add(data)
-            await db.commit()
+        return r.mappings().one()
+
+    async def insert_chat_emotions(self, rows:list[dict], db:AsyncSession):
+        # 동시에 /analyze 가 들어와 같은 chat_id 를 넣어도 PK 충돌 없이 무시한다.
+        # commit 은 이어지는 insert_today_emotion 에서 함께 한다.
+        if rows:
+            await db.execute(insert(ChatEmotion).prefix_with("IGNORE"), rows)
 
     async def get_calendar_data(self,year: int,month: int, user_code: int,db: AsyncSession):
         print(year)
@@ -58,11 +74,12 @@ class AnalysisRepo:
             end = datetime(year + 1, 1, 1)
         else:
             end = datetime(year, month + 1, 1)
+        # ORM 엔티티 대신 컬럼 값만 dict 로 가져온다.
         r = await db.execute(
-            select(AnalysisResult).where(
+            select(*AnalysisResult.__table__.columns).where(
                 AnalysisResult.user_code == user_code,
                 AnalysisResult.create_at >= start,
                 AnalysisResult.create_at < end
             )
         )
-        return r.scalars().all()
+        return [dict(row) for row in r.mappings().all()]
@@ -1,6 +1,7 @@
 from datetime import datetime, time, timedelta
-from sqlalchemy import select
+from sqlalchemy import select, or_, and_
 
+from db.mariadb import analysis_now
 from dto.token import DecodedToken
 from entity.entity import Chat
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -34,26 +35,55 @@ class ChatRepo:
         chats = sorted(chats, key=lambda c: (c.create_at, 1 if c.role == "ai" else 0), reverse=True)
         return chats
 
+    async def get_chats_by_cursor(self, db: AsyncSession, user: DecodedToken, before: tuple[datetime, int] | None, size: int = 20):
+        # OFFSET 대신 (create_at, chat_id) 보다 오래된 행부터 인덱스를 타고 바로 읽는다.
+        sql = select(Chat).where(Chat.user_code == user.user_code)
+        if before is not None:
+            create_at, chat_id = before
+            sql = sql.where(or_(
+                Chat.create_at < create_at,
+                and_(Chat.create_at == create_at, Chat.chat_id < chat_id)
+            ))
+        r = await db.execute(
+            sql.order_by(Chat.create_at.desc(), Chat.chat_id.desc())
+            .limit(size)
+        )
+        chats = r.scalars().all()
+        chats = sorted(chats, key=lambda c: (c.create_at, 1 if c.role == "ai" else 0), reverse=True)
+        return chats
+
     async def insert_chat(self, content, final_answer, user, db: AsyncSession):
-        human_msg = Chat(user_code=user.user_code, content=content, role="human", create_at=datetime.now())
+        human_msg = Chat(user_code=user.user_code, content=content, role="human", create_at=analysis_now())
         db.add(human_msg)
         await db.flush()
         
-        ai_msg = Chat(user_code=user.user_code, content=final_answer, role="ai", create_at=datetime.now())
+        ai_msg = Chat(user_code=user.user_code, content=final_answer, role="ai", create_at=analysis_now())
         db.add(ai_msg)
         await db.commit()
+        return [human_msg, ai_msg]
+
+    async def get_chats_after(self, user_code: int, after_chat_id: int, db: AsyncSession, limit: int):
+        # after_chat_id 이후의 대화 중 최신 limit 개를 오래된 순서로 가져온다.
+        r = await db.execute(
+            select(Chat)
+            .where(Chat.user_code == user_code, Chat.chat_id > after_chat_id)
+            .order_by(Chat.chat_id.desc())
+            .limit(limit)
+        )
+        return list(reversed(r.scalars().all()))
 
-    async def get_today_chat(self, user_code: int, db:AsyncSession):
-        today = datetime.now().date()
+    async def get_today_chat(self, user_code: int, db:AsyncSession, after_chat_id: int | None = None):
+        today = analysis_now().date()
         start = datetime.combine(today, time.min)
         end = start + timedelta(days=1)
-        r = await db.execute(
-            select(Chat).where(
-                Chat.user_code == user_code,
-                Chat.role == "human",
-                Chat.create_at >= start,
-                Chat.create_at < end
-            )
+        sql = select(Chat).where(
+            Chat.user_code == user_code,
+            Chat.role == "human",
+            Chat.create_at >= start,
+            Chat.create_at < end
         )
+        if after_chat_id is not None:
+            sql = sql.where(Chat.chat_id > after_chat_id)
+        r = await db.execute(sql.order_by(Chat.chat_id))
         r = r.scalars().all()
         return r
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from entity.entity import ChatSummary
+
+class SummaryRepo:
+    def __init__(self):
+        pass
+
+    async def get(self, user_code: int, db: AsyncSession) -> ChatSummary | None:
+        r = await db.execute(select(ChatSummary).where(ChatSummary.user_code == user_code))
+        return r.scalar_one_or_none()
+
+    async def upsert(self, user_code: int, summary: str, last_chat_id: int, db: AsyncSession):
+        sql = mysql_insert(ChatSummary).values(
+            user_code=user_code,
+            summary=summary,
+            last_chat_id=last_chat_id,
+            update_at=datetime.now(),
+        )
+        sql = sql.on_duplicate_key_update(
+            summary=sql.inserted.summary,
+            last_chat_id=sql.inserted.last_chat_id,
+            update_at=sql.inserted.update_at,
+        )
+        await db.execute(sql)
+        await db.commit()
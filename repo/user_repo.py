@@ -26,12 +26,16 @@ class UserRepo:
             raise HTTPException(status_code=500, detail="DB 처리 중 오류가 발생했습니다.")
 
 
-    async def insert_refresh_token(self, k_id:str, refresh_token:str, db: AsyncSession):
-        await db.execute(update(User).where(User.oauth_id == k_id).values(refresh_token=refresh_token))
+    async def insert_refresh_token(self, k_id:str, refresh_token_hash:str, db: AsyncSession) -> str | None:
+        # 교체된 이전 해시를 돌려준다.
+        r = await db.execute(select(User.refresh_token_hash).where(User.oauth_id == k_id))
+        previous = r.scalar()
+        await db.execute(update(User).where(User.oauth_id == k_id).values(refresh_token_hash=refresh_token_hash, refresh_token=None))
         await db.commit()
+        return previous
 
-    async def find_by_user_code(self, oauth_id: str, db: AsyncSession):
-        r =  await db.execute(select(User.refresh_token).where(User.oauth_id == oauth_id))
+    async def find_oauth_id_by_refresh_hash(self, refresh_token_hash: str, db: AsyncSession):
+        r = await db.execute(select(User.oauth_id).where(User.refresh_token_hash == refresh_token_hash))
         return r.scalar()
 
     async def find_by_user_oauth_id(self, oauth_id: str, db: AsyncSession):
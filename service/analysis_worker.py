@@ -0,0 +1,24 @@
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from service.emotion_service import EmotionService
+from service.job_queue import JobQueue
+from service.job_worker import UserJobWorker
+
+
+class AnalysisWorker(UserJobWorker):
+    name = "analysis"
+
+    def __init__(self, queue: JobQueue, emotion_svc: EmotionService):
+        super().__init__(
+            queue,
+            concurrency=int(os.getenv("ANALYSIS_WORKERS", "2")),
+            batch_size=int(os.getenv("ANALYSIS_BATCH_SIZE", "32")),
+            drain_timeout=float(os.getenv("ANALYSIS_DRAIN_TIMEOUT", "10")),
+        )
+        self.emotion_svc = emotion_svc
+
+    async def handle(self, user_codes: list[int], db: AsyncSession):
+        # 배치 안의 유저별 새 메시지를 한 번의 분류기 호출로 처리한다.
+        await self.emotion_svc.analyze_users(user_codes, db)
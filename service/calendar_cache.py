@@ -0,0 +1,56 @@
+import os
+import time
+from typing import Awaitable, Callable
+
+from db.cache import create_cache_backend
+from db.mariadb import analysis_now
+
+
+class CalendarCache:
+    """
+    (user_code, year, month) 단위 캘린더 조회 캐시입니다.
+    지난 달은 더 바뀌지 않으므로 길게 두고, 이번 달(과 이후)은 짧은 TTL 에 더해 감정 분석 결과가 저장될 때 무효화합니다.
+    인메모리 백엔드는 워커 프로세스마다 따로라서, 여러 워커에서 즉시 무효화가 필요하면 REDIS_URL 을 설정합니다.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or create_cache_backend("calendar:", maxsize=int(os.getenv("CALENDAR_CACHE_SIZE", "10000")))
+        self.current_month_ttl = float(os.getenv("CALENDAR_CACHE_CURRENT_TTL", "300"))
+        self.closed_month_ttl = float(os.getenv("CALENDAR_CACHE_CLOSED_TTL", "604800"))
+        self.hits = 0
+        self.misses = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+
+    @staticmethod
+    def key(user_code: int, year: int, month: int) -> str:
+        return f"{user_code}:{year}:{month}"
+
+    async def get_or_load(self, user_code: int, year: int, month: int, loader: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        start = time.perf_counter()
+        key = self.key(user_code, year, month)
+        data = await self.backend.get(key)
+        if data is not None:
+            self.hits += 1
+            self.hit_time += time.perf_counter() - start
+            return data
+
+        data = await loader()
+        now = analysis_now()
+        closed = (year, month) < (now.year, now.month)
+        await self.backend.set(key, data, self.closed_month_ttl if closed else self.current_month_ttl)
+        self.misses += 1
+        self.miss_time += time.perf_counter() - start
+        return data
+
+    async def invalidate(self, user_code: int, year: int, month: int):
+        await self.backend.delete(self.key(user_code, year, month))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "hit_avg_ms": round(self.hit_time / self.hits * 1000, 3) if self.hits else 0.0,
+            "miss_avg_ms": round(self.miss_time / self.misses * 1000, 3) if self.misses else 0.0,
+        }
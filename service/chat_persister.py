@@ -0,0 +1,238 @@
+import asyncio
+import glob
+import json
+import os
+from datetime import datetime
+from typing import Awaitable, Callable
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 개발 환경. 워커 하나만 띄운다고 보고 잠그지 않는다.
+    fcntl = None
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DataError, IntegrityError
+
+from db.mariadb import analysis_now
+from db.mariadb_orm import AsyncSessionLocal
+from entity.entity import Chat
+
+# INSERT 가 거부하지 않도록 add_turn 에서 잘라 둔다.
+CONTENT_MAX_LENGTH = Chat.__table__.c.content.type.length
+
+
+class ChatPersister:
+    """
+    여러 스트림의 대화 턴을 버퍼에 모았다가 multi-row INSERT 한 번으로 저장하는 write-behind 저장기입니다.
+    - 행 수(CHAT_FLUSH_SIZE) 또는 시간(CHAT_FLUSH_INTERVAL 초) 중 먼저 도달하는 쪽에서 flush 합니다.
+    - 한 턴의 human, ai 행은 버퍼에 연달아 들어가므로 한 INSERT 안에서 human 이 더 작은 chat_id 를 받습니다.
+    - 아직 저장되지 않은 행은 CHAT_SPILL_DIR 아래 워커(PID)별 append-only 파일에도 적어 두고(fsync), 시작할 때 다시 넣습니다.
+      워커는 살아 있는 동안 자기 .lock 파일을 잠가 두므로, 시작하는 워커는 잠글 수 있는(주인이 죽은) 파일만 가져갑니다.
+      저장 직후 파일을 정리하기 전에 죽으면 그 배치가 한 번 더 들어갈 수 있습니다. (at-least-once)
+    - 배치 INSERT 가 데이터 오류로 거부되면 한 행씩 다시 넣고, 그래도 실패한 행은 CHAT_DEAD_LETTER_PATH 에 남기고 버립니다.
+      연결 오류 같은 일시적인 실패만 배치를 버퍼에 되돌려 다음 주기에 다시 시도합니다.
+    """
+    def __init__(self):
+        self.flush_size = int(os.getenv("CHAT_FLUSH_SIZE", "100"))
+        self.flush_interval = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.2"))
+        self.spill_dir = os.getenv("CHAT_SPILL_DIR", ".chat_spill")
+        self.spill_path = os.path.join(self.spill_dir, f"{os.getpid()}.jsonl")
+        self.dead_letter_path = os.getenv("CHAT_DEAD_LETTER_PATH", os.path.join(self.spill_dir, "dead_letter.jsonl"))
+        self._buffer: list[dict] = []
+        # flush 가 INSERT 중인 행. 커밋이 끝날 때까지 pending() 에 계속 보인다.
+        self._inflight: list[dict] = []
+        self._flush_lock = asyncio.Lock()
+        # spill 파일 쓰기와 버퍼 변경을 같은 순서로 묶는다.
+        self._spill_lock = asyncio.Lock()
+        self._lock_file = None
+        self._id_step: int | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._listeners: list[Callable[[list[Chat]], Awaitable[None]]] = []
+        self._notify_tasks: set[asyncio.Task] = set()
+
+    def add_listener(self, listener: Callable[[list[Chat]], Awaitable[None]]):
+        # flush 가 커밋된 뒤 chat_id 가 채워진 Chat 목록으로 호출된다.
+        self._listeners.append(listener)
+
+    async def start(self):
+        rows = await asyncio.to_thread(self._claim_spills)
+        if rows:
+            print(f"저장되지 않은 대화 {len(rows)}개를 다시 저장합니다.")
+            self._buffer.extend(rows)
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._run(), name="chat-persister")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # 남은 행은 spill 파일에 있으므로 다음 시작 때 다시 저장된다.
+            print(f"종료 중 대화 저장 실패, 남은 대화 {len(self._buffer)}개: {e}")
+        # 분석/요약 작업 등록까지 끝나야 워커가 마저 처리할 수 있다.
+        await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+        if self._lock_file is not None:
+            # 잠금을 풀면 다음에 시작하는 워커가 남은 spill 파일을 가져간다.
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def add_turn(self, user_code: int, content: str, answer: str):
+        # 분석의 "오늘" 범위와 같은 시계로 찍는다.
+        now = analysis_now()
+        rows = [
+            {"user_code": user_code, "content": (content or "")[:CONTENT_MAX_LENGTH], "role": "human", "create_at": now},
+            {"user_code": user_code, "content": (answer or "")[:CONTENT_MAX_LENGTH], "role": "ai", "create_at": now},
+        ]
+        async with self._spill_lock:
+            await asyncio.to_thread(self._append_spill, rows)
+            self._buffer.extend(rows)
+        if len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    def pending(self, user_code: int) -> list[Chat]:
+        # 아직 DB 에 없는(INSERT 중인 것 포함) 이 유저의 행. 다음 요청의 대화 기록에 합쳐서 쓴다.
+        return [Chat(**row) for row in (*self._inflight, *self._buffer) if row["user_code"] == user_code]
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"대화 저장 실패, 다음 주기에 다시 시도합니다: {e}")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            self._inflight = rows
+            try:
+                chats = await self._insert(rows)
+            except (DataError, IntegrityError) as e:
+                # 배치 안의 어떤 행이 거부됐다. 한 행씩 넣어서 나머지는 살린다.
+                print(f"대화 배치 저장 거부, 한 행씩 다시 저장합니다: {e}")
+                chats = await self._insert_one_by_one(rows)
+            except Exception:
+                self._buffer = rows + self._buffer
+                raise
+            finally:
+                self._inflight = []
+            async with self._spill_lock:
+                await asyncio.to_thread(self._rewrite_spill, list(self._buffer))
+
+        # 느린 리스너가 다음 flush 를 막지 않도록 따로 실행한다.
+        if chats and self._listeners:
+            task = asyncio.create_task(self._notify(chats))
+            self._notify_tasks.add(task)
+            task.add_done_callback(self._notify_tasks.discard)
+
+    async def _notify(self, chats: list[Chat]):
+        for listener in self._listeners:
+            try:
+                await listener(chats)
+            except Exception as e:
+                print(e)
+
+    async def _insert(self, rows: list[dict]) -> list[Chat]:
+        async with AsyncSessionLocal() as db:
+            if self._id_step is None:
+                self._id_step = (await db.execute(text("SELECT @@auto_increment_increment"))).scalar_one()
+            # 한 문장의 multi-row INSERT 는 행 순서대로 auto_increment_increment 간격의 연속된 값을 받는다.
+            result = await db.execute(insert(Chat).values(rows))
+            await db.commit()
+        first_id = result.lastrowid
+        return [Chat(chat_id=first_id + i * self._id_step, **row) for i, row in enumerate(rows)]
+
+    async def _insert_one_by_one(self, rows: list[dict]) -> list[Chat]:
+        # 순서대로 넣으므로 human 이 ai 보다 작은 chat_id 를 받는 것은 그대로다.
+        chats = []
+        for i, row in enumerate(rows):
+            try:
+                chats += await self._insert([row])
+            except (DataError, IntegrityError) as e:
+                await asyncio.to_thread(self._dead_letter, row, e)
+            except Exception as e:
+                # 일시적인 실패면 남은 행은 버퍼에 되돌려 다음 주기에 다시 시도한다.
+                print(f"대화 저장 실패, 다음 주기에 다시 시도합니다: {e}")
+                self._buffer = rows[i:] + self._buffer
+                break
+        return chats
+
+    def _dead_letter(self, row: dict, error: Exception):
+        print(f"저장할 수 없는 대화를 {self.dead_letter_path} 에 남깁니다: {error}")
+        record = {**row, "create_at": row["create_at"].isoformat(), "error": str(error)}
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _dump(rows: list[dict]) -> str:
+        return "".join(json.dumps({**row, "create_at": row["create_at"].isoformat()}, ensure_ascii=False) + "\n" for row in rows)
+
+    @staticmethod
+    def _load(path: str) -> list[dict]:
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    row["create_at"] = datetime.fromisoformat(row["create_at"])
+                    rows.append(row)
+        return rows
+
+    def _append_spill(self, rows: list[dict]):
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write(self._dump(rows))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_spill(self, rows: list[dict]):
+        if not rows:
+            if os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
+            return
+        tmp = self.spill_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self._dump(rows))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.spill_path)
+
+    def _claim_spills(self) -> list[dict]:
+        # 자기 lock 을 잡은 뒤, 주인이 없는(잠글 수 있는) 다른 워커의 spill 파일을 가져와 자기 파일로 옮긴다.
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._lock_file = open(self.spill_path[:-len(".jsonl")] + ".lock", "w")
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+        rows = self._load(self.spill_path) if os.path.exists(self.spill_path) else []
+        for path in glob.glob(os.path.join(self.spill_dir, "*.jsonl")):
+            if path in (self.spill_path, self.dead_letter_path):
+                continue
+            lock_path = path[:-len(".jsonl")] + ".lock"
+            with open(lock_path, "a") as lock:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # 살아 있는 워커의 파일
+                        continue
+                if not os.path.exists(path):
+                    continue
+                orphan = self._load(path)
+                self._append_spill(orphan)
+                rows += orphan
+                os.remove(path)
+                os.remove(lock_path)
+        return rows
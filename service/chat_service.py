@@ -1,71 +1,229 @@
+import base64
 import json
+from datetime import datetime
 
-from langchain_core.messages import AIMessage, ToolMessage
-from pymongo import MongoClient
+from fastapi import HTTPException
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
 
 from dto.token import DecodedToken
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from db.chat_memory import ChatMemory, ROLE_NAMES, create_chat_memory
+from db.mariadb_orm import AsyncSessionLocal
+from db.mongodb import MentalHealthVectorDb
+from db.vector_index import LocalVectorIndex
 from repo.chat_repo import ChatRepo
+from service.chat_persister import ChatPersister
+from service.context_builder import ContextBuilder, normalize_content
+from service.summary_service import SummaryService
+from service.embedding_service import get_embedding_service
+from service.job_queue import JobQueue
+from service.llm_gateway import GatewayMiddleware, INTERACTIVE, get_llm_gateway
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 import os
+
+def encode_cursor(create_at: datetime, chat_id: int) -> str:
+    raw = json.dumps([create_at.isoformat(), chat_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        create_at, chat_id = json.loads(raw)
+        return datetime.fromisoformat(create_at), int(chat_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
+
+_chat_memory: ChatMemory | None = None
+
+async def load_user_chats(user_code: int, after_chat_id: int, limit: int) -> list[dict]:
+    # 로컬 대화 메모리가 비어 있거나 뒤처졌을 때 MariaDB 에서 채울 대화
+    async with AsyncSessionLocal() as db:
+        chats = await ChatRepo().get_chats_after(user_code, after_chat_id, db, limit)
+    return [
+        {"chat_id": chat.chat_id, "role": chat.role, "content": chat.content, "create_at": chat.create_at}
+        for chat in chats
+    ]
+
+async def embed_chats(texts: list[str]) -> list[list[float]]:
+    return await get_embedding_service().embed_documents(texts)
+
+def get_chat_memory() -> ChatMemory:
+    global _chat_memory
+    if _chat_memory is None:
+        _chat_memory = create_chat_memory(load_user_chats, embed_chats)
+    return _chat_memory
+
 @tool
-async def search_vector_db_user_chat(query: str):
+async def search_vector_db_user_chat(query: str, config: RunnableConfig):
     """이 도구는 사용자의 현재 질문으로 사용자와 전에 했던 말을 벡터 검색하는 도구입니다. 사용자 대화에서 꼭 필요하다고 판단될 때 사용하세요. 매개변수는 사용자의 질문입니다."""
     print("도구 호출함")
-    embedding_model = OpenAIEmbeddings(api_key=os.getenv("OPEN_AI_API_KEY"))
-    embedded_query = await asyncio.to_thread(embedding_model.embed_query, query)
-    return "사용자는 백앤드 서버로 파일을 업로드 할 때 발생하는 에러를 파일을 청킹하여 업로드하여 해결했다."
+    # 요청한 사용자는 agent 실행 config 로 전달된다.
+    user_code = config.get("configurable", {}).get("user_code")
+    if user_code is None:
+        return "관련된 과거 대화가 없습니다."
+    embedded_query = await get_embedding_service().embed_query(query)
+    results = await get_chat_memory().search(user_code, embedded_query, 5)
+    # 이미 프롬프트의 [이전 대화]에 있는 내용과 서로 겹치는 결과는 빼서 같은 텍스트를 두 번 넣지 않는다.
+    seen = set(config.get("configurable", {}).get("history", ()))
+    lines = []
+    for r in results:
+        key = normalize_content(r["content"])
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(f"- {ROLE_NAMES.get(r['role'], r['role'])}: {r['content']}")
+    if not lines:
+        return "관련된 과거 대화가 없습니다."
+    return "\n".join(lines)
+
+_mental_health_db: MentalHealthVectorDb | None = None
+
+def get_mental_health_db() -> MentalHealthVectorDb:
+    global _mental_health_db
+    if _mental_health_db is None:
+        _mental_health_db = MentalHealthVectorDb()
+    return _mental_health_db
+
+# 시작 시 로드되는 멘탈 케어 문서 로컬 인덱스. 없으면 Atlas $vectorSearch 로 대체한다.
+_mental_health_index: LocalVectorIndex | None = None
+
+async def load_mental_health_index():
+    global _mental_health_index
+    path = os.getenv("VECTOR_INDEX_PATH", ".model_cache/mental_health_index")
+    try:
+        # 파일을 만든 뒤 컬렉션이 바뀌었으면(문서 수나 청크 해시가 다르면) 다시 만든다.
+        fingerprint = await get_mental_health_db().fingerprint()
+        if LocalVectorIndex.exists(path) and LocalVectorIndex.load_fingerprint(path) == fingerprint:
+            index = await asyncio.to_thread(LocalVectorIndex.load, path)
+        else:
+            docs = await get_mental_health_db().fetch_all()
+            index = LocalVectorIndex.build(
+                [doc.pop("embedding") for doc in docs],
+                docs
+            )
+            await asyncio.to_thread(index.save, path)
+        _mental_health_index = index
+        print(f"멘탈 케어 로컬 인덱스 로드: {len(index)}개 청크")
+    except Exception as e:
+        print(f"멘탈 케어 로컬 인덱스 로드 실패, Atlas 검색을 사용합니다: {e}")
 
 @tool
 async def search_vector_db_mental_health(query: str):
     """이 도구는 전문적인 사용자 멘탈 케어를 위한 의학 도서관입니다. 사용자가 정신의학에 관한 질문을 하면 이 도구를 활용하세요. 매개변수는 사용자의 질문입니다."""
     print("정신의학 도구 호출함")
-    MONGO = os.getenv("MONGO")
-    embedding_model = OpenAIEmbeddings(api_key=os.getenv("OPEN_AI_API_KEY"))
-    embedded_query = await asyncio.to_thread(embedding_model.embed_query, query)
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "index": "vector_index",
-                "path": "embedding",
-                "queryVector": embedded_query,
-                "numCandidates": 100,
-                "limit": 5
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "text": 1,
-                "metadata": 1,
-                "score": {
-                    "$meta": "vectorSearchScore"
-                }
-            }
-        }
-    ]
-    client = MongoClient(MONGO)
-    db = client["mentalcare_chat_bot"]
-    collection = db["docs"]
-    print(list(collection.aggregate(pipeline)))
-    return list(collection.aggregate(pipeline))
+    embedded_query = await get_embedding_service().embed_query(query)
+    if _mental_health_index is not None:
+        result = _mental_health_index.search(embedded_query, 5)
+    else:
+        result = await get_mental_health_db().vector_search(embedded_query)
+    print(result)
+    return result
 
 class ChatService:
-    def __init__(self):
+    def __init__(self, job_queue: JobQueue | None = None, persister: ChatPersister | None = None, summary_svc: SummaryService | None = None):
         self.repo = ChatRepo()
+        # 저장된 사용자 메시지를 감정 분석 워커로 넘기는 큐
+        self.job_queue = job_queue
+        # 있으면 대화 턴을 write-behind 로 모아서 저장하고, 없으면 요청 세션에서 바로 저장한다.
+        self.persister = persister
+        if persister is not None:
+            persister.add_listener(self.on_chats_saved)
+        # 있으면 오래된 대화 대신 롤링 요약을 프롬프트에 넣는다.
+        self.summary_svc = summary_svc
         self.llm = ChatOpenAI(model="gpt-4o-mini", api_key=os.getenv("OPEN_AI_API_KEY"))
         self.chat_model_tools = [search_vector_db_user_chat,search_vector_db_mental_health]
+        # 모델/도구 구성별로 컴파일된 agent 그래프. 요청별 상태는 payload 로만 넘기므로 동시 스트림이 공유해도 된다.
+        self._agents: dict[tuple, object] = {}
+        # 대화 기록을 토큰 예산에 맞춰 프롬프트로 만든다.
+        self.context_builder = ContextBuilder()
+        self._background_tasks: set[asyncio.Task] = set()
         self.chat_model_system_prompt = "너는 사용자의 대화에 답변하는 AI이다.\n대화 기록만으로 답변할 수 있으면 도구를 사용하지 마라.\n사용자를 존중하며 높임말로 대답해라.\n당신은 전문가다. 전문가를 추천하지 말아라.\n도구를 사용했다면 그 내용을 바탕으로 자연스럽게 대답해라.\n답변할 때는 가독성을 높이기 위해 반드시 마크다운(Markdown) 문법을 적극적으로 활용해라. (예: 굵은 글씨, 목록, 표, 인용구 등)"
+
+    def _run_in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def remember_chats(self, user_code: int, chats: list):
+        # 저장된 대화를 임베딩해서 사용자별 벡터 메모리에 넣는다.
+        chats = [chat for chat in chats if chat.content]
+        try:
+            embeddings = await get_embedding_service().embed_documents([chat.content for chat in chats])
+            await get_chat_memory().add(user_code, [
+                {"chat_id": chat.chat_id, "role": chat.role, "content": chat.content, "create_at": chat.create_at, "embedding": embedding}
+                for chat, embedding in zip(chats, embeddings)
+            ])
+        except Exception as e:
+            print(f"대화 메모리 저장 실패: {e}")
+
+    async def on_chats_saved(self, chats: list):
+        # chat_id 가 정해진 뒤에 할 일: 벡터 메모리 저장과 감정 분석 작업 등록
+        by_user: dict[int, list] = {}
+        for chat in chats:
+            by_user.setdefault(chat.user_code, []).append(chat)
+        for user_code, user_chats in by_user.items():
+            self._run_in_background(self.remember_chats(user_code, user_chats))
+            last_human = max((c.chat_id for c in user_chats if c.role == "human"), default=None)
+            if last_human is None:
+                continue
+            if self.job_queue is not None:
+                await self.job_queue.put({"user_code": user_code, "chat_id": last_human})
+            if self.summary_svc is not None:
+                await self.summary_svc.notify(user_code, last_human)
+
+    def get_agent(self):
+        key = (id(self.llm), tuple(t.name for t in self.chat_model_tools), self.chat_model_system_prompt)
+        agent = self._agents.get(key)
+        if agent is None:
+            agent = create_agent(
+                model=self.llm,
+                tools=self.chat_model_tools,
+                system_prompt=self.chat_model_system_prompt,
+                # 모델 호출마다 게이트웨이의 interactive 슬롯을 잡는다.
+                middleware=[GatewayMiddleware(get_llm_gateway(), INTERACTIVE)]
+            )
+            self._agents[key] = agent
+        return agent
+
     async def get_chats(self, db:AsyncSession, user:DecodedToken, count:int=10):
-        return await self.repo.get_chats(db, user, count)
+        chats = await self.repo.get_chats(db, user, count)
+        if self.persister is None:
+            return chats
+        # 아직 flush 되지 않은 최근 턴도 대화 기록에 포함한다.
+        pending = self.persister.pending(user.user_code)
+        if not pending:
+            return chats
+        # 커밋 직후에는 같은 행이 DB 결과와 pending 양쪽에 보일 수 있다. (DATETIME 은 초 단위로 저장된다)
+        saved = {(c.role, c.content, c.create_at.replace(microsecond=0)) for c in chats}
+        pending = [c for c in pending if (c.role, c.content, c.create_at.replace(microsecond=0)) not in saved]
+        chats = sorted([*chats, *pending], key=lambda c: (c.create_at, 1 if c.role == "ai" else 0))
+        return chats[-count:]
+
+    async def get_history(self, db:AsyncSession, user:DecodedToken, count:int=10) -> tuple[str | None, list]:
+        # (롤링 요약, 요약 이후의 최근 대화). 요약이 없으면 최근 count 개 대화만 쓴다.
+        if self.summary_svc is None:
+            return None, await self.get_chats(db, user, count)
+        summary, last_chat_id = await self.summary_svc.get(user.user_code, db)
+        chats = await self.get_chats(db, user, max(count, self.summary_svc.window))
+        if summary is not None:
+            chats = [chat for chat in chats if chat.chat_id is None or chat.chat_id > last_chat_id]
+        return summary, chats
 
-    async def get_chats_by_page(self, db:AsyncSession, user:DecodedToken, page:int, size:int=20):
-        chats = await self.repo.get_chats_by_page(db, user, page, size)
+    async def get_chats_by_page(self, db:AsyncSession, user:DecodedToken, page:int, size:int=20, before:str|None=None):
+        if before is not None:
+            chats = await self.repo.get_chats_by_cursor(db, user, decode_cursor(before), size)
+        else:
+            chats = await self.repo.get_chats_by_page(db, user, page, size)
         is_last = len(chats) < size
+        next_cursor = None
+        if not is_last:
+            oldest = min(chats, key=lambda c: (c.create_at, c.chat_id))
+            next_cursor = encode_cursor(oldest.create_at, oldest.chat_id)
         content = [
             {
                 "content": chat.content,
@@ -84,20 +242,23 @@ class ChatService:
         ]
         return {
             "last": is_last,
+            "next_cursor": next_cursor,
             "content": content
         }
 
-    async def response_llm(self, content: str, chats: list, user, db:AsyncSession):
+    async def response_llm(self, content: str, chats: list, user, db:AsyncSession, summary: str | None = None):
         yield json.dumps({
             "type": "status",
             "message": "생각 중..."
         }, ensure_ascii=False) + "\n"
-        agent = create_agent(
-            model=self.llm,
-            tools=self.chat_model_tools,
-            system_prompt=self.chat_model_system_prompt
-        )
-        chat_text = "\n".join(f"{chat.role}: {chat.content}"for chat in chats)
+        agent = self.get_agent()
+        context = self.context_builder.build(chats)
+        chat_text = context["text"]
+        if summary:
+            chat_text = f"[이전 대화 요약]\n{summary}\n\n[최근 대화]\n{chat_text}"
+        fixed_tokens = self.context_builder.count(self.chat_model_system_prompt) + self.context_builder.count(content) + self.context_builder.count(summary)
+        prompt_tokens = fixed_tokens + context["tokens"]
+        self.context_builder.record(fixed_tokens + context["raw_tokens"], prompt_tokens)
         payload = {
             "messages": [
                 {
@@ -112,9 +273,27 @@ class ChatService:
             ]
         }
         final_answer = ""
-        async for chunk in agent.astream(payload, stream_mode="updates"):
+        config = {"configurable": {"user_code": user.user_code, "history": context["contents"]}}
+        # messages 모드로 모델 토큰을 받는 즉시 delta 로 보내고, updates 모드로 도구 호출/결과와 최종 답변을 받는다.
+        async for mode, chunk in agent.astream(payload, config=config, stream_mode=["updates", "messages"]):
+            if mode == "messages":
+                token, metadata = chunk
+                # 도구 호출을 만드는 중인 조각과 도구 노드의 메시지는 보내지 않는다.
+                if (
+                    isinstance(token, AIMessageChunk)
+                    and metadata.get("langgraph_node") == "model"
+                    and not token.tool_call_chunks
+                    and isinstance(token.content, str)
+                    and token.content
+                ):
+                    yield json.dumps({
+                        "type": "delta",
+                        "content": token.content
+                    }, ensure_ascii=False) + "\n"
+                continue
+
             for node_name, node_data in chunk.items():
-                messages = node_data.get("messages", [])
+                messages = (node_data or {}).get("messages", [])
 
                 for msg in messages:
                     if isinstance(msg, AIMessage) and getattr(msg, "tool_calls", None):
@@ -135,8 +314,12 @@ class ChatService:
 
                     elif isinstance(msg, AIMessage) and msg.content:
                         final_answer = msg.content
-        # 디비 저장
-        await self.repo.insert_chat(content, final_answer, user, db)
+        # 디비 저장. persister 가 있으면 버퍼에 넣고 바로 final 을 보낸다.
+        if self.persister is not None:
+            await self.persister.add_turn(user.user_code, content, final_answer)
+        else:
+            human_msg, ai_msg = await self.repo.insert_chat(content, final_answer, user, db)
+            await self.on_chats_saved([human_msg, ai_msg])
         yield json.dumps({
             "type": "final",
             "answer": final_answer
@@ -0,0 +1,107 @@
+import math
+import os
+import threading
+from typing import TypedDict
+
+# tiktoken 이 없거나 인코딩 파일을 받을 수 없을 때 쓰는 추정치 (한국어 기준으로 넉넉하게)
+CHARS_PER_TOKEN = 1.5
+# 예산 끝에 남은 자리가 이보다 작으면 메시지를 잘라 넣지 않는다.
+MIN_TAIL_TOKENS = 32
+
+
+def normalize_content(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+class ChatContext(TypedDict):
+    text: str
+    tokens: int
+    raw_tokens: int
+    contents: frozenset[str]
+
+
+class ContextBuilder:
+    """
+    최근 대화 기록을 토큰 예산(CHAT_CONTEXT_TOKENS) 안에 맞춰 프롬프트용 텍스트로 만드는 클래스입니다.
+    - 최신 메시지부터 채우고, 최근 CHAT_CONTEXT_RECENT 개는 그대로, 그보다 오래된 메시지는 CHAT_CONTEXT_MESSAGE_TOKENS 로 자릅니다.
+    - 같은 내용이 반복된 메시지는 가장 최근 것 하나만 남깁니다.
+    - 토큰 수는 tiktoken 으로 세고, 쓸 수 없으면 글자 수로 추정합니다.
+    """
+    def __init__(self, max_tokens: int | None = None, message_tokens: int | None = None, recent: int | None = None, encoding: str = "o200k_base"):
+        self.max_tokens = max_tokens or int(os.getenv("CHAT_CONTEXT_TOKENS", "1500"))
+        self.message_tokens = message_tokens or int(os.getenv("CHAT_CONTEXT_MESSAGE_TOKENS", "300"))
+        self.recent = recent if recent is not None else int(os.getenv("CHAT_CONTEXT_RECENT", "2"))
+        self.encoder = None
+        try:
+            import tiktoken
+            self.encoder = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            print(f"tiktoken 을 쓸 수 없어 글자 수로 토큰을 추정합니다: {e}")
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.raw_tokens = 0
+        self.prompt_tokens = 0
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoder is not None:
+            return len(self.encoder.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoder is not None:
+            tokens = self.encoder.encode(text, disallowed_special=())
+            return self.encoder.decode(tokens[:max_tokens]) + "…"
+        return text[:int(max_tokens * CHARS_PER_TOKEN)] + "…"
+
+    def build(self, chats: list) -> ChatContext:
+        # chats 는 오래된 순서. 최신 메시지부터 예산을 채운 뒤 원래 순서로 되돌린다.
+        lines: list[str] = []
+        seen: set[tuple[str, str]] = set()
+        used = raw = 0
+        budget_left = True
+        for i, chat in enumerate(reversed(chats)):
+            content = normalize_content(chat.content)
+            if not content:
+                continue
+            line = f"{chat.role}: {chat.content}"
+            n = self.count(line)
+            raw += n
+            if not budget_left or (chat.role, content) in seen:
+                continue
+
+            if i >= self.recent and n > self.message_tokens:
+                line = self.truncate(line, self.message_tokens)
+                n = self.count(line)
+            if used + n > self.max_tokens:
+                budget_left = False
+                remaining = self.max_tokens - used
+                if remaining < MIN_TAIL_TOKENS:
+                    continue
+                line = self.truncate(line, remaining)
+                n = self.count(line)
+            seen.add((chat.role, content))
+            lines.append(line)
+            used += n
+        lines.reverse()
+        return {"text": "\n".join(lines), "tokens": used, "raw_tokens": raw, "contents": frozenset(content for _, content in seen)}
+
+    def record(self, raw_tokens: int, prompt_tokens: int):
+        with self._lock:
+            self.requests += 1
+            self.raw_tokens += raw_tokens
+            self.prompt_tokens += prompt_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.requests or 1
+            return {
+                "requests": self.requests,
+                "max_tokens": self.max_tokens,
+                "avg_raw_tokens": round(self.raw_tokens / requests, 1),
+                "avg_prompt_tokens": round(self.prompt_tokens / requests, 1),
+                "saved_ratio": round(1 - self.prompt_tokens / self.raw_tokens, 3) if self.raw_tokens else 0.0,
+            }
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import re
+import unicodedata
+
+from db.cache import LruCache
+
+
+def normalize_query(text: str) -> str:
+    # 공백/대소문자/전각 문자 차이만 있는 질문은 같은 캐시 키를 쓴다.
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def create_embedding_backend():
+    # EMBEDDING_BACKEND=fake 이면 네트워크 없이 테스트할 수 있는 결정적 가짜 임베딩을 쓴다.
+    if os.getenv("EMBEDDING_BACKEND", "openai") == "fake":
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=1536)
+    from langchain_openai import OpenAIEmbeddings
+    model = os.getenv("EMBEDDING_MODEL")
+    if model:
+        return OpenAIEmbeddings(api_key=os.getenv("OPEN_AI_API_KEY"), model=model)
+    return OpenAIEmbeddings(api_key=os.getenv("OPEN_AI_API_KEY"))
+
+
+class EmbeddingService:
+    """
+    프로세스 전체가 공유하는 쿼리 임베딩 클라이언트입니다.
+    (모델명, 정규화된 질문) 을 키로 LRU/TTL 캐시를 두고(임베딩은 원문으로 요청), 같은 질문이 동시에 들어오면 업스트림 호출 하나를 함께 기다립니다.
+    """
+    def __init__(self, backend=None, maxsize: int | None = None, ttl: float | None = None, coalesce: bool = True):
+        self.backend = backend or create_embedding_backend()
+        self.model_name = getattr(self.backend, "model", type(self.backend).__name__)
+        self.cache = LruCache(
+            maxsize=maxsize or int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+            ttl=ttl or float(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+        )
+        self.coalesce = coalesce
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    async def embed_query(self, text: str) -> list[float]:
+        # 정규화한 질문은 캐시 키로만 쓰고, 임베딩은 원문으로 받는다.
+        # 캐시된 리스트를 호출한 쪽이 고쳐도 다른 요청에 번지지 않도록 복사해서 돌려준다.
+        key = (self.model_name, normalize_query(text))
+        vector = self.cache.get(key)
+        if vector is not None:
+            return list(vector)
+        if not self.coalesce:
+            return list(await self._fetch(key, text))
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, text))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # 기다리던 요청 하나가 취소돼도 같은 질문을 기다리는 다른 요청에는 영향이 없도록 한다.
+        return list(await asyncio.shield(task))
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # 저장용 문서 임베딩은 캐시하지 않는다.
+        if not texts:
+            return []
+        self.upstream_calls += 1
+        return await self.backend.aembed_documents(texts)
+
+    async def _fetch(self, key: tuple, text: str) -> list[float]:
+        self.upstream_calls += 1
+        vector = await self.backend.aembed_query(text)
+        self.cache.set(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "model": self.model_name,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+
+_embedding_service: EmbeddingService | None = None
+
+def get_embedding_service() -> EmbeddingService:
+    global _embedding_service
+    if _embedding_service is None:
+        _embedding_service = EmbeddingService()
+    return _embedding_service
@@ -1,52 +1,105 @@
+import asyncio
+import os
+from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, cast
 
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from transformers import pipeline
 
 from dto.token import DecodedToken
 from repo.chat_repo import ChatRepo
+from db.mariadb import analysis_now
 from repo.analysis_repo import AnalysisRepo
 from entity.entity import Chat, AnalysisResult
+from model.registry import model_registry
+from service.calendar_cache import CalendarCache
 
 
+# 분류기 라벨 -> chat_emotion / analysis_result 컬럼
+EMOTION_COLUMNS:dict = {"분노": "anger", "불안": "anxiety", "슬픔": "sadness", "평온": "calmness", "당황": "confusion", "기쁨": "happy"}
+
 class EmotionItem(TypedDict):
     label:str
     score:float
 
 class EmotionService:
     def __init__(self):
-        self.classifier = pipeline("text-classification", model="Seonghaa/korean-emotion-classifier-roberta",top_k=None)
+        self.batch_size = int(os.getenv("EMOTION_BATCH_SIZE", "32"))
+        # 추론 전용 스레드. 이벤트 루프와 기본 executor 를 막지 않도록 분리한다.
+        self.executor = ThreadPoolExecutor(max_workers=int(os.getenv("EMOTION_WORKERS", "1")), thread_name_prefix="emotion")
         self.chat_repo = ChatRepo()
         self.analysis_repo = AnalysisRepo()
+        self.calendar_cache = CalendarCache()
+
+    @property
+    def classifier(self):
+        # 첫 분류 요청(또는 lifespan warm-up) 때 로드된다.
+        return model_registry.get("emotion")
+
+    def _classify_batch(self, texts:list[str]) -> list[list[EmotionItem]]:
+        # batch_size 단위로 패딩된 배치 추론을 한다.
+        return self.classifier.predict(texts, batch_size=self.batch_size)
 
-    async def today_analyze_chat(self, chat_history:list[Chat]) -> dict:
-        result:dict = {"분노": 0.0,"불안": 0.0,"슬픔": 0.0,"평온": 0.0,"당황": 0.0,"기쁨": 0.0}
-        for chat in chat_history:
-            classifications = self.classifier(chat.content)
-            classifications:list[dict] = classifications[0]
+    async def classify(self, texts:list[str]) -> list[list[EmotionItem]]:
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._classify_batch, texts)
 
-            for cls in classifications:
+    def _fold(self, totals, new_chats:list[Chat], classifications:list[list[EmotionItem]]) -> tuple[dict, list[dict]]:
+        # 기존 합계에 새 메시지의 라벨 확률을 더해 평균을 내고, chat_emotion 에 넣을 행을 만든다.
+        result:dict = {label: float(totals[column]) for label, column in EMOTION_COLUMNS.items()}
+        rows:list[dict] = []
+        for chat, chat_classifications in zip(new_chats, classifications):
+            row = {"chat_id": chat.chat_id, "user_code": chat.user_code, "create_at": chat.create_at}
+            row.update({column: 0.0 for column in EMOTION_COLUMNS.values()})
+            for cls in chat_classifications:
                 label = cls.get("label")
                 score = cls.get("score", 0)
 
                 if label in result:
                     result[label] += score
+                    row[EMOTION_COLUMNS[label]] = score
+            rows.append(row)
+
+        count = totals["count"] + len(new_chats)
         for r in result:
-            result[r] = round((result[r] / len(chat_history)) * 100)
-        return result
+            result[r] = round((result[r] / count) * 100)
+        return result, rows
+
+    async def analyze_users(self, user_codes:list[int], db:AsyncSession):
+        # 이미 분류한 메시지는 chat_emotion 합계로 대신하고, 마지막 chat_id 이후의 새 메시지만 분류한다.
+        pending = []
+        for user_code in user_codes:
+            totals = await self.analysis_repo.get_today_emotion_totals(user_code, db)
+            new_chats:list[Chat] = await self.chat_repo.get_today_chat(user_code, db, after_chat_id=totals["last_chat_id"])
+            if len(new_chats) != 0:
+                pending.append((user_code, totals, new_chats))
+        if not pending:
+            return
 
-    async def insert_today_emotion(self, today_analyze: dict, user:DecodedToken, db:AsyncSession):
-        emotion_name, emotion_score = max(today_analyze.items(), key=lambda x: x[1])
-        user_code:int = user.user_code
-        await self.analysis_repo.insert_today_emotion(today_analyze, emotion_name, user_code, db)
+        # 여러 유저의 메시지를 한 번에 배치 분류한다.
+        texts = [chat.content or "" for _, _, new_chats in pending for chat in new_chats]
+        classifications = await self.classify(texts)
+        offset = 0
+        for user_code, totals, new_chats in pending:
+            today_analyze, rows = self._fold(totals, new_chats, classifications[offset:offset + len(new_chats)])
+            offset += len(new_chats)
+            await self.analysis_repo.insert_chat_emotions(rows, db)
+            emotion_name, emotion_score = max(today_analyze.items(), key=lambda x: x[1])
+            await self.analysis_repo.insert_today_emotion(today_analyze, emotion_name, user_code, db)
+            now = analysis_now()
+            await self.calendar_cache.invalidate(user_code, now.year, now.month)
 
     async def get_today_chats(self, user, db) -> list[Chat]:
         chats:list[Chat] = await self.chat_repo.get_today_chat(user.user_code, db)
         return chats
 
-    async def get_calendar_data(self, year:int, month:int, user:DecodedToken, db:AsyncSession):
-        data:list[AnalysisResult] = await self.analysis_repo.get_calendar_data(year, month, user.user_code, db)
-        return data
-
+    async def get_calendar_data(self, year:int, month:int, user:DecodedToken, db:AsyncSession) -> list[dict]:
+        async def load() -> list[dict]:
+            rows:list[dict] = await self.analysis_repo.get_calendar_data(year, month, user.user_code, db)
+            # 캐시(JSON)에 그대로 넣을 수 있도록 날짜를 문자열로 바꾼다.
+            return [{k: v.isoformat() if isinstance(v, (datetime, date)) else v for k, v in row.items()} for row in rows]
+        return await self.calendar_cache.get_or_load(user.user_code, year, month, load)
 
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import random
+from datetime import datetime, timezone
+from typing import Iterator
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pymongo import UpdateOne
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 130
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+def iter_blocks(path: str, block_chars: int = 64_000) -> Iterator[str]:
+    # 파일 전체를 올리지 않고 문단 경계("\n\n")에서 끊어 블록 단위로 읽는다.
+    buf = ""
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            data = f.read(block_chars)
+            if not data:
+                break
+            buf += data
+            cut = buf.rfind("\n\n")
+            if cut > 0:
+                yield buf[:cut]
+                buf = buf[cut + 2:]
+    if buf.strip():
+        yield buf
+
+
+def content_hash(text: str, model: str) -> str:
+    # 임베딩 모델이 바뀌면 같은 청크도 다시 임베딩되도록 모델명을 함께 넣는다.
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+class IngestService:
+    """
+    문서 파일을 청킹/임베딩해서 멘탈 케어 벡터 컬렉션에 넣는 증분 파이프라인입니다.
+    이미 저장된 청크((source, content_hash) 기준)는 임베딩하지 않고, 새 청크만 배치로 동시에 임베딩해서 bulk upsert 합니다.
+    """
+    def __init__(self, collection, embedder, batch_size: int = 64, concurrency: int = 4, max_retries: int = 5):
+        self.collection = collection
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            separators=SEPARATORS,
+            length_function=len,
+        )
+
+    def iter_chunks(self, path: str) -> Iterator[str]:
+        for block in iter_blocks(path):
+            yield from self.splitter.split_text(block)
+
+    async def _embed_with_retry(self, texts: list[str]) -> list[list[float]]:
+        for attempt in range(self.max_retries):
+            try:
+                return await self.embedder.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = min(30.0, 2 ** attempt) + random.random()
+                print(f"임베딩 실패, {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+
+    async def _write_batch(self, source: str, batch: list[tuple[int, str, str]], sem: asyncio.Semaphore, stats: dict):
+        async with sem:
+            vectors = await self._embed_with_retry([text for _, _, text in batch])
+            stats["embedded"] += len(batch)
+            now = datetime.now(timezone.utc)
+            ops = [
+                UpdateOne(
+                    {"metadata.source": source, "metadata.content_hash": h},
+                    {"$set": {
+                        "text": text,
+                        "embedding": vector,
+                        "metadata": {
+                            "source": source,
+                            "chunk_id": i,
+                            "chunk_size": len(text),
+                            "content_hash": h,
+                            "embedding_model": self.embedder.model_name,
+                            "created_at": now,
+                        },
+                    }},
+                    upsert=True,
+                )
+                for (i, h, text), vector in zip(batch, vectors)
+            ]
+            result = await self.collection.bulk_write(ops, ordered=False)
+            stats["upserted"] += result.upserted_count + result.modified_count
+
+    async def ingest(self, paths: list[str], source: str, prune: bool = True) -> dict:
+        # 한 source 의 파일은 한 번에 넣어야 prune 이 다른 파일의 청크를 지우지 않는다.
+        # 같은 청크가 다른 소스에도 있을 수 있으므로 (source, content_hash) 로 구분한다.
+        await self.collection.create_index([("metadata.source", 1), ("metadata.content_hash", 1)])
+        stored = set(await self.collection.distinct("metadata.content_hash", {"metadata.source": source}))
+        stats = {"chunks": 0, "skipped": 0, "embedded": 0, "upserted": 0, "deleted": 0}
+
+        current: set[str] = set()
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks: list[asyncio.Task] = []
+        batch: list[tuple[int, str, str]] = []
+        chunks = (chunk for path in paths for chunk in self.iter_chunks(path))
+        for i, chunk in enumerate(chunks):
+            stats["chunks"] += 1
+            h = content_hash(chunk, self.embedder.model_name)
+            if h in stored or h in current:
+                stats["skipped"] += 1
+                current.add(h)
+                continue
+            current.add(h)
+            batch.append((i, h, chunk))
+            if len(batch) >= self.batch_size:
+                tasks.append(asyncio.create_task(self._write_batch(source, batch, sem, stats)))
+                batch = []
+                # 동시에 대기 중인 배치 수를 제한해서 메모리를 일정하게 유지한다.
+                if len(tasks) >= self.concurrency * 2:
+                    await asyncio.gather(*tasks)
+                    tasks = []
+        if batch:
+            tasks.append(asyncio.create_task(self._write_batch(source, batch, sem, stats)))
+        await asyncio.gather(*tasks)
+
+        if prune:
+            # 소스에서 사라진 청크(와 content_hash 가 없는 예전 문서)를 지운다.
+            result = await self.collection.delete_many({
+                "metadata.source": source,
+                "metadata.content_hash": {"$nin": list(current)},
+            })
+            stats["deleted"] = result.deleted_count
+        return stats
@@ -0,0 +1,57 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+
+class JobQueue(ABC):
+    """
+    백그라운드 작업 큐 인터페이스입니다.
+    작업은 dict 형태(직렬화 가능)로 주고받으므로 로컬 asyncio 큐 대신 Redis 리스트 같은 외부 큐로 교체할 수 있습니다.
+    """
+    @abstractmethod
+    async def put(self, job: dict):
+        ...
+
+    @abstractmethod
+    async def get_batch(self, max_size: int) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def task_done(self, count: int = 1):
+        ...
+
+    @abstractmethod
+    async def join(self):
+        ...
+
+    @abstractmethod
+    def qsize(self) -> int:
+        ...
+
+
+class LocalJobQueue(JobQueue):
+    def __init__(self, maxsize: int = 1000, linger: float = 0.05):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # 첫 작업을 받은 뒤 배치를 모으기 위해 잠깐 기다리는 시간(초)
+        self._linger = linger
+
+    async def put(self, job: dict):
+        # 큐가 가득 차면 빈 자리가 생길 때까지 대기한다 (backpressure)
+        await self._queue.put(job)
+
+    async def get_batch(self, max_size: int) -> list[dict]:
+        batch = [await self._queue.get()]
+        if self._linger:
+            await asyncio.sleep(self._linger)
+        while len(batch) < max_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def task_done(self, count: int = 1):
+        for _ in range(count):
+            self._queue.task_done()
+
+    async def join(self):
+        await self._queue.join()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
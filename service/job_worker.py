@@ -0,0 +1,73 @@
+import asyncio
+import weakref
+from abc import ABC, abstractmethod
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.mariadb_orm import AsyncSessionLocal
+from service.job_queue import JobQueue
+
+
+class UserJobWorker(ABC):
+    """
+    JobQueue 에서 {"user_code", ...} 작업을 배치로 꺼내 유저 단위로 처리하는 워커의 공통 부분입니다.
+    같은 유저를 두 워커가 동시에 처리하지 않으며, 하위 클래스는 handle 만 구현합니다.
+    """
+    name = "job"
+
+    def __init__(self, queue: JobQueue, concurrency: int, batch_size: int, drain_timeout: float):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.drain_timeout = drain_timeout
+        self._tasks: list[asyncio.Task] = []
+        # 쓰는 워커가 없으면 자동으로 사라진다.
+        self._user_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    @abstractmethod
+    async def handle(self, user_codes: list[int], db: AsyncSession):
+        ...
+
+    def start(self):
+        for i in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._run(), name=f"{self.name}-worker-{i}"))
+
+    async def stop(self):
+        # 남은 작업을 처리할 시간을 준 뒤 워커를 종료한다.
+        try:
+            await asyncio.wait_for(self.queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"{self.name} 큐 drain 시간 초과, 남은 작업 {self.queue.qsize()}개")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run(self):
+        while True:
+            jobs = await self.queue.get_batch(self.batch_size)
+            try:
+                await self._process(jobs)
+            except Exception as e:
+                print(e)
+            finally:
+                self.queue.task_done(len(jobs))
+
+    async def _process(self, jobs: list[dict]):
+        user_codes = sorted({job["user_code"] for job in jobs})
+        locks = [self._lock_for(u) for u in user_codes]
+        for lock in locks:
+            await lock.acquire()
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.handle(user_codes, db)
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _lock_for(self, user_code: int) -> asyncio.Lock:
+        lock = self._user_locks.get(user_code)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user_code] = lock
+        return lock
@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import httpx
+from fastapi import HTTPException
+
+from dto.kakao_response import KaKaoTokenResponse, KaKaoUserResponse
+
+KAKAO_AUTH_URL = os.getenv("KAKAO_AUTH_URL", "https://kauth.kakao.com")
+KAKAO_API_URL = os.getenv("KAKAO_API_URL", "https://kapi.kakao.com")
+
+# 인가 코드는 한 번만 쓸 수 있으므로 토큰 발급(POST)은 요청이 처리되지 않았다고 볼 수 있는 응답에서만 재시도한다.
+GET_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+POST_RETRY_STATUSES = frozenset({429, 503})
+
+
+class KakaoClient:
+    """
+    Kakao OAuth 토큰 발급과 유저 정보 조회용 비동기 HTTP 클라이언트입니다.
+    - 프로세스에서 하나의 httpx.AsyncClient 를 공유해 keep-alive 커넥션을 재사용합니다.
+    - 연결 실패와 일시적인 오류 응답은 지수 backoff 로 KAKAO_HTTP_RETRIES 번까지 다시 시도합니다.
+    """
+    def __init__(self, auth_url: str = KAKAO_AUTH_URL, api_url: str = KAKAO_API_URL):
+        self.auth_url = auth_url
+        self.api_url = api_url
+        self.max_retries = int(os.getenv("KAKAO_HTTP_RETRIES", "2"))
+        self.backoff = float(os.getenv("KAKAO_HTTP_BACKOFF", "0.2"))
+        timeout = float(os.getenv("KAKAO_HTTP_TIMEOUT", "5"))
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 3.0)),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("KAKAO_HTTP_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=int(os.getenv("KAKAO_HTTP_MAX_KEEPALIVE", "20")),
+                keepalive_expiry=30,
+            ),
+        )
+
+    async def _request(self, method: str, url: str, retry_statuses: frozenset[int], **kwargs) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code not in retry_statuses or attempt == self.max_retries:
+                    return response
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # 요청이 서버에 닿지 않은 경우만 재시도한다.
+                if attempt == self.max_retries:
+                    print(e)
+                    raise HTTPException(status_code=502, detail="카카오 서버에 연결할 수 없습니다.")
+            except httpx.TimeoutException as e:
+                print(e)
+                raise HTTPException(status_code=504, detail="카카오 서버 응답 시간 초과")
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    async def get_token(self, client_id: str, redirect_uri: str, code: str) -> KaKaoTokenResponse:
+        data: dict = {
+            "grant_type": "authorization_code",
+            "client_id": client_id,
+            "redirect_uri": redirect_uri,
+            "code": code,
+        }
+        response = await self._request(
+            "POST", f"{self.auth_url}/oauth/token", POST_RETRY_STATUSES,
+            headers={"Content-Type": "application/x-www-form-urlencoded;charset=utf-8"}, data=data,
+        )
+        if response.status_code == 200:
+            return KaKaoTokenResponse.model_validate(response.json())
+        raise HTTPException(status_code=500, detail=response.json())
+
+    async def get_user(self, token: str) -> KaKaoUserResponse:
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded;charset=utf-8",
+            "Authorization": f"Bearer {token}",
+        }
+        response = await self._request(
+            "GET", f"{self.api_url}/v2/user/me", GET_RETRY_STATUSES,
+            headers=headers, params={"secure_resource": "1"},
+        )
+        if response.status_code == 200:
+            return KaKaoUserResponse.model_validate(response.json())
+        raise HTTPException(status_code=500, detail=response.json())
+
+    async def aclose(self):
+        await self.client.aclose()
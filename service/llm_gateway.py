@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware
+
+from service.context_builder import CHARS_PER_TOKEN
+
+# 숫자가 작을수록 먼저 처리된다.
+INTERACTIVE = 0
+BATCH = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class TokenBucket:
+    """분당 용량(capacity)만큼 채워지는 버킷. capacity 가 0 이면 제한하지 않는다."""
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        # 한 번에 용량보다 큰 요청도 버킷이 가득 차면 보낸다.
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        if self.capacity:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+
+class LlmGateway:
+    """
+    프로세스에서 나가는 LLM 호출을 제한하는 게이트웨이입니다.
+    - 동시에 진행 중인 호출은 LLM_MAX_CONCURRENCY 개까지만 허용합니다.
+    - 분당 요청 수(LLM_RPM)와 토큰 수(LLM_TPM) 토큰 버킷을 넘지 않도록 대기시킵니다.
+    - 기다리는 호출은 우선순위(INTERACTIVE > BATCH), 같은 우선순위 안에서는 도착 순서로 통과합니다.
+    - 같은 키의 요청이 진행 중이면 업스트림 호출 하나를 함께 기다립니다. (coalesce)
+    """
+    def __init__(self, max_concurrency: int | None = None, rpm: float | None = None, tpm: float | None = None):
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.requests = TokenBucket(rpm if rpm is not None else float(os.getenv("LLM_RPM", "500")))
+        self.tokens = TokenBucket(tpm if tpm is not None else float(os.getenv("LLM_TPM", "200000")))
+        self._cond = asyncio.Condition()
+        self._waiters: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self._inflight_keys: dict[tuple, asyncio.Task] = {}
+        self.coalesced = 0
+        self._lanes = {lane: {"calls": 0, "wait_total": 0.0, "wait_max": 0.0} for lane in LANE_NAMES}
+
+    def _ready_in(self, tokens: int) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    async def acquire(self, priority: int = INTERACTIVE, tokens: int = 1000):
+        start = time.perf_counter()
+        entry = (priority, next(self._seq))
+        async with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    if self._waiters[0] == entry and self.in_flight < self.max_concurrency:
+                        wait = self._ready_in(tokens)
+                        if wait <= 0:
+                            break
+                        # 버킷이 찰 때까지 기다린다. 그 사이 더 급한 요청이 오면 깨어나서 순서를 다시 본다.
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), wait)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self._cond.wait()
+            except BaseException:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self._cond.notify_all()
+
+        waited = time.perf_counter() - start
+        lane = self._lanes[priority]
+        lane["calls"] += 1
+        lane["wait_total"] += waited
+        lane["wait_max"] = max(lane["wait_max"], waited)
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def settle(self, estimated: int, actual: int | None):
+        # 실제 사용량을 알면 미리 뺀 추정치와의 차이를 버킷에 되돌린다.
+        if actual is not None:
+            self.tokens.consume(actual - estimated)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE, tokens: int = 1000):
+        await self.acquire(priority, tokens)
+        try:
+            yield
+        finally:
+            await self.release()
+
+    async def coalesce(self, key: tuple, factory: Callable[[], Awaitable]):
+        task = self._inflight_keys.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight_keys[key] = task
+            task.add_done_callback(lambda _: self._inflight_keys.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "coalesced": self.coalesced,
+            "lanes": {
+                LANE_NAMES[lane]: {
+                    "calls": s["calls"],
+                    "wait_avg_ms": round(s["wait_total"] / s["calls"] * 1000, 2) if s["calls"] else 0.0,
+                    "wait_max_ms": round(s["wait_max"] * 1000, 2),
+                }
+                for lane, s in self._lanes.items()
+            },
+        }
+
+
+def estimate_tokens(messages: list, max_output_tokens: int | None = None) -> int:
+    # 호출 전 토큰 버킷에서 뺄 추정치. 정확한 값은 응답의 usage_metadata 로 settle 한다.
+    output = max_output_tokens or int(os.getenv("LLM_OUTPUT_TOKENS", "800"))
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return math.ceil(chars / CHARS_PER_TOKEN) + output
+
+
+def usage_tokens(message) -> int | None:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class GatewayMiddleware(AgentMiddleware):
+    """agent 의 모델 호출마다 게이트웨이 슬롯을 잡는 미들웨어입니다."""
+    def __init__(self, gateway: LlmGateway, priority: int = INTERACTIVE):
+        super().__init__()
+        self.gateway = gateway
+        self.priority = priority
+
+    async def awrap_model_call(self, request, handler):
+        estimated = estimate_tokens([getattr(request, "system_prompt", None) or "", *request.messages])
+        async with self.gateway.slot(self.priority, estimated):
+            response = await handler(request)
+        result = getattr(response, "result", None)
+        if result:
+            self.gateway.settle(estimated, usage_tokens(result[-1]))
+        return response
+
+
+_llm_gateway: LlmGateway | None = None
+
+def get_llm_gateway() -> LlmGateway:
+    global _llm_gateway
+    if _llm_gateway is None:
+        _llm_gateway = LlmGateway()
+    return _llm_gateway
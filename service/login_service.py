@@ -1,25 +1,47 @@
+import asyncio
 import os
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 import jwt
 import requests
 from fastapi import Cookie, HTTPException
 from requests import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from db.cache import LruCache
 from dto.kakao_response import KaKaoTokenResponse, KaKaoUserResponse
 from dto.token import DecodedToken
 from repo.user_repo import UserRepo
+from service.kakao_client import KakaoClient, KAKAO_AUTH_URL, KAKAO_API_URL
+from service.token_allowlist import RefreshTokenAllowlist, hash_token
 from entity.entity import User
 
 
-def get_user(refill_t: str | None = Cookie(default=None)) -> DecodedToken:
+@lru_cache(maxsize=1)
+def jwt_settings() -> tuple[str, str]:
+    # (secret, algorithm). .env 로드 후 첫 요청 때 한 번만 읽는다.
+    return os.environ['JWT_SECRET'], os.environ['JWT_ALGORITHM']
+
+# 검증을 마친 access token -> DecodedToken. 항목은 토큰의 exp 에 만료된다.
+token_cache = LruCache(maxsize=int(os.getenv("JWT_CACHE_SIZE", "10000")))
+
+async def get_user(refill_t: str | None = Cookie(default=None)) -> DecodedToken:
     if refill_t is None:
         raise HTTPException(status_code=401, detail='토큰이 없습니다.')
+    user = token_cache.get(refill_t)
+    if user is not None:
+        return user
+    secret, algorithm = jwt_settings()
     try:
-        payload = jwt.decode(refill_t, os.environ['JWT_SECRET'], os.environ['JWT_ALGORITHM'])
-        return DecodedToken.model_validate(payload)
+        payload = jwt.decode(refill_t, secret, algorithm)
+        user = DecodedToken.model_validate(payload)
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="토큰 해독 에러")
+    ttl = user.exp - time.time()
+    if ttl > 0:
+        token_cache.set(refill_t, user, ttl)
+    return user
 
 class LoginService:
     def __init__(self):
@@ -30,7 +52,24 @@ class LoginService:
         self.JWT_REFRESH_EXPIRE_MINUTE= os.environ['JWT_REFRESH_EXPIRE_MINUTE']
         self.KAKAO_CLIENT_ID = os.environ['KAKAO_CLIENT_ID']
         self.KAKAO_REDIRECT_URI=os.environ['KAKAO_REDIRECT_URI']
-        pass
+        # KAKAO_HTTP_SYNC=1 이면 예전 requests 경로를 쓴다. (스레드에서 실행)
+        self.kakao_sync = os.getenv("KAKAO_HTTP_SYNC") == "1"
+        self.kakao = KakaoClient()
+        self.refresh_allowlist = RefreshTokenAllowlist()
+
+    async def fetch_kakao_token(self, code: str) -> KaKaoTokenResponse:
+        if self.kakao_sync:
+            return await asyncio.to_thread(self.get_kakao_token, code)
+        return await self.kakao.get_token(self.KAKAO_CLIENT_ID, self.KAKAO_REDIRECT_URI, code)
+
+    async def fetch_kakao_user(self, token: str) -> KaKaoUserResponse:
+        if self.kakao_sync:
+            return await asyncio.to_thread(self.get_kakao_user, token)
+        return await self.kakao.get_user(token)
+
+    async def aclose(self):
+        await self.kakao.aclose()
+
     def get_kakao_token(self, code: str) -> KaKaoTokenResponse:
         content_type:str = "application/x-www-form-urlencoded;charset=utf-8"
         data:dict = {
@@ -39,7 +78,7 @@ class LoginService:
             "redirect_uri": self.KAKAO_REDIRECT_URI,
             "code": code,
         }
-        response:Response = requests.post("https://kauth.kakao.com/oauth/token",headers={"Content-Type": content_type}, data=data)
+        response:Response = requests.post(f"{KAKAO_AUTH_URL}/oauth/token",headers={"Content-Type": content_type}, data=data)
         if response.status_code == 200:
             return KaKaoTokenResponse.model_validate(response.json())
         else:
@@ -52,7 +91,7 @@ class LoginService:
                 "Content-Type": "application/x-www-form-urlencoded;charset=utf-8",
                 "Authorization": f"Bearer {token}",
             }
-            response:Response = requests.get("https://kapi.kakao.com/v2/user/me?secure_resource=1", headers=headers)
+            response:Response = requests.get(f"{KAKAO_API_URL}/v2/user/me?secure_resource=1", headers=headers)
             if response.status_code == 200:
                 return KaKaoUserResponse.model_validate(response.json())
             else:
@@ -94,7 +133,8 @@ class LoginService:
         await self.user_repo.create_new_user(user, db)
 
     async def insert_refresh_token(self, k_id, refresh_token, db:AsyncSession):
-        await self.user_repo.insert_refresh_token(k_id, refresh_token, db)
+        previous = await self.user_repo.insert_refresh_token(k_id, hash_token(refresh_token), db)
+        await self.refresh_allowlist.revoke(previous)
 
     async def check_refresh_token(self, refresh_token, db):
         if refresh_token is None:
@@ -107,12 +147,15 @@ class LoginService:
             raise HTTPException(status_code=401, detail="유효하지 않은 리프레시 토큰입니다.")
 
         oauth_id = payload.get("oauth_id")
-        saved_token = await self.user_repo.find_by_user_code(oauth_id, db)
-
-        if saved_token is None or saved_token == "":
-            raise HTTPException(status_code=401, detail="저장된 리프레시 토큰이 없습니다.")
-        if saved_token != refresh_token:
-            raise HTTPException(status_code=401, detail="리프레시 토큰이 일치하지 않습니다.")
+        if oauth_id is None:
+            raise HTTPException(status_code=401, detail="유효하지 않은 리프레시 토큰입니다.")
+        token_hash = hash_token(refresh_token)
+        # 최근에 DB 에서 확인한 토큰이면 바로 통과시킨다.
+        if await self.refresh_allowlist.get(token_hash) != oauth_id:
+            saved_oauth_id = await self.user_repo.find_oauth_id_by_refresh_hash(token_hash, db)
+            if saved_oauth_id is None or saved_oauth_id != oauth_id:
+                raise HTTPException(status_code=401, detail="리프레시 토큰이 일치하지 않습니다.")
+            await self.refresh_allowlist.add(token_hash, oauth_id, payload["exp"])
         payload.update({"exp":datetime.now() + timedelta(minutes=float(self.JWT_EXPIRE_MINUTE))})
         new_access_token = jwt.encode(payload, self.JWT_SECRET, algorithm=self.JWT_ALGORITHM)
         return new_access_token
@@ -0,0 +1,96 @@
+import os
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repo.chat_repo import ChatRepo
+from repo.summary_repo import SummaryRepo
+from service.context_builder import ContextBuilder
+from service.job_queue import JobQueue
+from service.job_worker import UserJobWorker
+from service.llm_gateway import BATCH, estimate_tokens, get_llm_gateway, usage_tokens
+
+
+class SummaryService:
+    """
+    유저별 롤링 대화 요약을 관리하는 클래스입니다.
+    - 요약에 반영되지 않은 대화가 CHAT_SUMMARY_EVERY 턴을 넘으면, 최근 CHAT_SUMMARY_KEEP 개 메시지를 남기고 나머지를 기존 요약에 합칩니다.
+    - 챗봇에는 요약 + 요약 이후의 대화만 넘기므로 기록이 길어져도 프롬프트 크기가 거의 일정합니다.
+    """
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.every = int(os.getenv("CHAT_SUMMARY_EVERY", "5"))
+        self.keep = int(os.getenv("CHAT_SUMMARY_KEEP", "6"))
+        self.summary_tokens = int(os.getenv("CHAT_SUMMARY_TOKENS", "400"))
+        self.chat_repo = ChatRepo()
+        self.summary_repo = SummaryRepo()
+        self.context_builder = ContextBuilder()
+        self.llm = ChatOpenAI(model="gpt-4.1-nano", api_key=os.getenv("OPEN_AI_API_KEY"))
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    "너는 정신 건강 상담 챗봇의 대화 기록을 관리하는 요약가이다. "
+                    "기존 요약과 새 대화를 합쳐 사용자에 대한 최신 요약을 작성해라. "
+                    "사용자의 상황, 감정, 겪은 일, 챗봇이 제안한 내용을 중심으로 500자 이내로 작성하고, 오래되었거나 덜 중요한 내용은 줄여라.",
+                ),
+                ("human", "[기존 요약]\n{summary}\n\n[새 대화]\n{chats}"),
+            ]
+        )
+        self._chain = prompt | self.llm
+
+    @property
+    def window(self) -> int:
+        # 요약 이후 아직 요약되지 않은 메시지 수의 상한 (갱신 직전 기준)
+        return self.keep + self.every * 2
+
+    async def get(self, user_code: int, db: AsyncSession) -> tuple[str | None, int]:
+        row = await self.summary_repo.get(user_code, db)
+        if row is None:
+            return None, 0
+        return row.summary, row.last_chat_id
+
+    async def notify(self, user_code: int, chat_id: int):
+        await self.queue.put({"user_code": user_code, "chat_id": chat_id})
+
+    async def refresh(self, user_code: int, db: AsyncSession):
+        summary, last_chat_id = await self.get(user_code, db)
+        # 요약이 없는 오래된 유저도 최근 window 만큼만 읽어서 한 번에 요약한다.
+        chats = await self.chat_repo.get_chats_after(user_code, last_chat_id, db, self.window + self.every * 2)
+        if len(chats) < self.window:
+            return
+        target = chats[:-self.keep] if self.keep else chats
+        chat_text = "\n".join(
+            self.context_builder.truncate(f"{chat.role}: {chat.content}", self.context_builder.message_tokens)
+            for chat in target if chat.content
+        )
+        inputs = {"summary": summary or "(없음)", "chats": chat_text}
+        gateway = get_llm_gateway()
+        estimated = estimate_tokens([inputs["summary"], chat_text])
+        async with gateway.slot(BATCH, estimated):
+            result = await self._chain.ainvoke(inputs)
+        gateway.settle(estimated, usage_tokens(result))
+        new_summary = self.context_builder.truncate((result.content or "").strip(), self.summary_tokens)
+        await self.summary_repo.upsert(user_code, new_summary, target[-1].chat_id, db)
+
+
+class SummaryWorker(UserJobWorker):
+    name = "summary"
+
+    def __init__(self, summary_svc: SummaryService):
+        super().__init__(
+            summary_svc.queue,
+            concurrency=int(os.getenv("SUMMARY_WORKERS", "1")),
+            batch_size=int(os.getenv("SUMMARY_BATCH_SIZE", "16")),
+            drain_timeout=float(os.getenv("SUMMARY_DRAIN_TIMEOUT", "10")),
+        )
+        self.summary_svc = summary_svc
+
+    async def handle(self, user_codes: list[int], db: AsyncSession):
+        for user_code in user_codes:
+            try:
+                await self.summary_svc.refresh(user_code, db)
+            except Exception as e:
+                await db.rollback()
+                print(f"대화 요약 갱신 실패 (user {user_code}): {e}")
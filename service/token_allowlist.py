@@ -0,0 +1,32 @@
+import hashlib
+import os
+import time
+
+from db.cache import create_cache_backend
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class RefreshTokenAllowlist:
+    """
+    DB 에서 확인한 refresh token 해시 -> oauth_id 캐시입니다.
+    항목은 REFRESH_ALLOWLIST_TTL 초(또는 토큰 만료 중 이른 쪽)까지만 살아 있으므로, 다른 워커에서 토큰이 교체/폐기되어도
+    그 시간 안에 반영됩니다. 같은 프로세스(또는 REDIS_URL 공유 시 모든 워커)에서는 교체할 때 바로 지웁니다.
+    """
+    def __init__(self, backend=None):
+        self.ttl = float(os.getenv("REFRESH_ALLOWLIST_TTL", "300"))
+        self.backend = backend or create_cache_backend("refresh:", maxsize=int(os.getenv("REFRESH_ALLOWLIST_SIZE", "10000")), ttl=self.ttl)
+
+    async def get(self, token_hash: str) -> str | None:
+        return await self.backend.get(token_hash)
+
+    async def add(self, token_hash: str, oauth_id: str, exp: int):
+        ttl = min(self.ttl, exp - time.time())
+        if ttl > 0:
+            await self.backend.set(token_hash, oauth_id, ttl)
+
+    async def revoke(self, token_hash: str | None):
+        if token_hash:
+            await self.backend.delete(token_hash)